@@ -0,0 +1,55 @@
+"""
+Measures how the solvers scale with the grid size and the number of boxes,
+using seeded levels from sokoban.generator.
+
+Usage: python -m benchmarks.scaling [--seeds 3] [--beam-width 5] [--save-dir generated_maps]
+"""
+from sokoban.generator import generate_level
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import min_weight_bfs
+
+import argparse
+import time
+
+# (height, width, num_boxes)
+SIZES = [
+    (10, 10, 2),
+    (20, 20, 4),
+    (30, 30, 8),
+    (50, 50, 15),
+    (100, 100, 30),
+]
+
+def run(sizes, seeds, beam_width, save_dir=None):
+    rows = []
+    for height, width, num_boxes in sizes:
+        for seed in range(seeds):
+            level = generate_level(height, width, num_boxes, seed=seed)
+            if save_dir is not None:
+                level.save_to_yaml(f'{save_dir}/{level.test_name}.yaml')
+
+            solver = BeamSearch(level, beam_width, min_weight_bfs)
+            start_time = time.time()
+            path = solver.solve()
+            runtime = time.time() - start_time
+
+            solved = path is not None and path[-1].is_solved()
+            rows.append((height, width, num_boxes, seed, solved, solver.explored_states, runtime))
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--beam-width', type=int, default=5)
+    parser.add_argument('--save-dir', default=None)
+    args = parser.parse_args()
+
+    rows = run(SIZES, args.seeds, args.beam_width, args.save_dir)
+
+    print(f"{'grid':>9} {'boxes':>5} {'seed':>4} {'solved':>6} {'explored':>9} {'runtime':>8}")
+    for height, width, num_boxes, seed, solved, explored, runtime in rows:
+        print(f'{height:>4}x{width:<4} {num_boxes:>5} {seed:>4} {str(solved):>6} {explored:>9} {runtime:>8.2f}')
+
+if __name__ == '__main__':
+    main()
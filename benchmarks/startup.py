@@ -0,0 +1,63 @@
+"""
+Measures the import time and peak RSS of the solver-only import path, each in a fresh
+interpreter, and checks that it doesn't drag in the rendering / GIF / YAML / scipy stacks.
+Exits with status 1 if one of them shows up, so it can guard the lazy imports.
+
+Usage: python -m benchmarks.startup [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# What a worker process that only solves imports
+SOLVER_IMPORTS = 'import sokoban, search_methods.beam_search, search_methods.lrta_star, search_methods.hda_star'
+# What the notebook imports, for comparison
+FULL_IMPORTS = SOLVER_IMPORTS + '; from sokoban import render, gif; import imageio, yaml, scipy.optimize'
+
+HEAVY_MODULES = ['matplotlib', 'imageio', 'yaml', 'scipy']
+
+PROBE = '''
+import resource, sys, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, rss_kb, ','.join(heavy))
+'''
+
+def measure(imports, runs):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times, rss = [], []
+    heavy = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(imports=imports, heavy=HEAVY_MODULES)],
+            cwd=repo_root, capture_output=True, text=True, check=True
+        ).stdout.split()
+        times.append(float(output[0]))
+        rss.append(int(output[1]) / 1024)
+        heavy = output[2].split(',') if len(output) > 2 else []
+
+    return statistics.median(times), statistics.median(rss), heavy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    solver = measure(SOLVER_IMPORTS, args.runs)
+    full = measure(FULL_IMPORTS, args.runs)
+
+    print(f"{'path':<8} {'import (ms)':>12} {'peak RSS (MB)':>14}  heavy modules")
+    for name, (elapsed, rss_mb, heavy) in (('solver', solver), ('full', full)):
+        print(f"{name:<8} {elapsed * 1000:>12.1f} {rss_mb:>14.1f}  {', '.join(heavy) or '-'}")
+
+    if solver[2]:
+        print(f"Solver-only import path loaded: {', '.join(solver[2])}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
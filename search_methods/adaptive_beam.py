@@ -0,0 +1,147 @@
+from .solver import Solver
+from .beam_search import BeamSearch
+from sokoban.map import Map
+
+from contextlib import redirect_stdout
+import io
+import multiprocessing as mp
+
+
+def run_attempt(map_obj: Map, heuristic: callable, allow_pulls: bool, patience: int | None,
+                corral_pruning: bool, width: int, seed: int | None) -> dict:
+    """
+    One beam search run, returns the keys of its path and whether it reached the goal.
+    The per-run prints are swallowed, the coordinator reports the outcome.
+    """
+    solver = BeamSearch(map_obj, width, heuristic, allow_pulls=allow_pulls, seed=seed, patience=patience)
+    if corral_pruning:
+        solver.enable_corral_pruning()
+    with redirect_stdout(io.StringIO()):
+        path = solver.solve()
+
+    solved = bool(path) and path[-1].is_solved()
+    return {
+        'width': width,
+        'seed': seed,
+        'solved': solved,
+        'path': [solver.get_hashable_state(map_obj) for map_obj in path or []],
+        'heuristic': 0 if solved else (heuristic(path[-1]) if path else float('inf')),
+        # explored_states is only set when the goal is reached, every attempt counts here
+        'explored_states': solver.visited_states,
+        'pruned_successors': solver.pruned_successors,
+    }
+
+def run_attempt_args(args: tuple) -> dict:
+    return run_attempt(*args)
+
+
+class AdaptiveBeamSearch(Solver):
+    """
+    Beam search with restarts that doesn't need its width tuned per map.
+
+    Attempts start with a narrow beam, which is cheap and enough for most maps. A run that
+    empties its beam or goes patience steps without improving its best heuristic counts as
+    failed, and the width is multiplied by growth for the next round, up to max_width.
+    Every width is tried restarts times: the first run keeps the plain BeamSearch order,
+    the others break heuristic ties at random with their own seed.
+
+    With several workers the attempts are handed out to a process pool in order of width,
+    so narrow runs finish first, and the pool is stopped at the first solution.
+    """
+
+    def __init__(self, map: Map, heuristic: callable, initial_width: int = 2, growth: int = 2,
+                 max_width: int = 256, restarts: int | None = None, patience: int | None = 20,
+                 num_workers: int | None = None, allow_pulls=False, seed: int = 0, corral_pruning=False):
+        super().__init__(map)
+        if initial_width < 1 or growth < 2:
+            raise ValueError('initial_width has to be at least 1 and growth at least 2')
+        if initial_width > max_width:
+            raise ValueError(f'initial_width ({initial_width}) can not be larger than max_width ({max_width})')
+        if restarts is not None and restarts < 1:
+            raise ValueError(f'restarts has to be at least 1, got {restarts}')
+        self.heuristic = heuristic
+        self.initial_width = initial_width
+        self.growth = growth
+        self.max_width = max_width
+        self.num_workers = num_workers or mp.cpu_count()
+        # By default every round keeps all the workers busy
+        self.restarts = self.num_workers if restarts is None else restarts
+        self.patience = patience
+        self.allow_pulls = allow_pulls
+        self.seed = seed
+        if corral_pruning:
+            self.enable_corral_pruning()
+        self.explored_states = 0
+        self.attempts = []
+
+    def widths(self) -> list:
+        widths = []
+        width = self.initial_width
+        while width <= self.max_width:
+            widths.append(width)
+            width *= self.growth
+        return widths
+
+    def schedule(self) -> list:
+        """
+        Arguments of every attempt, narrowest widths first
+        """
+        schedule = []
+        for width in self.widths():
+            for restart in range(self.restarts):
+                seed = None if restart == 0 else self.seed + len(schedule)
+                schedule.append((self.map, self.heuristic, self.allow_pulls, self.patience,
+                                 self.corral_pruner is not None, width, seed))
+        return schedule
+
+    def run_attempts(self):
+        """
+        Yields the attempts as they finish, stopping the remaining ones when the caller stops iterating
+        """
+        schedule = self.schedule()
+        if self.num_workers == 1:
+            for args in schedule:
+                yield run_attempt_args(args)
+            return
+
+        ctx = mp.get_context()
+        with ctx.Pool(self.num_workers) as pool:
+            # Leaving the with block terminates the attempts still running
+            yield from pool.imap_unordered(run_attempt_args, schedule)
+
+    def solve(self):
+        initial_map_state = self.map
+
+        if self.heuristic(initial_map_state) == float('inf'):
+            print("Initial state is deadlocked according to heuristic.")
+            return None
+        if initial_map_state.is_solved():
+            print("Initial state is already solved.")
+            return [initial_map_state.copy()]
+
+        self.attempts = []
+        best = None
+        attempts = self.run_attempts()
+        for attempt in attempts:
+            self.attempts.append(attempt)
+            if best is None or attempt['heuristic'] < best['heuristic']:
+                best = attempt
+            if attempt['solved']:
+                attempts.close()
+                break
+
+        self.explored_states = sum(attempt['explored_states'] for attempt in self.attempts)
+        if self.corral_pruner is not None:
+            # The attempts prune, the coordinator's pruner only reports their total
+            self.corral_pruner.pruned = sum(attempt['pruned_successors'] for attempt in self.attempts)
+
+        if best['solved']:
+            print(f"Goal state found with beam width {best['width']} (seed {best['seed']}) "
+                  f"after {len(self.attempts)} attempts!\nExplored states: {self.explored_states}")
+        else:
+            print(f"Goal not reached with beam widths up to {self.max_width}. "
+                  f"Reconstructing path to best state found (heuristic: {best['heuristic']}).")
+
+        state_sequence = self.replay_hashable_path(best['path'], self.allow_pulls)
+        print(f"Reconstructed path size: {len(state_sequence)}")
+        return state_sequence
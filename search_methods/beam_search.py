@@ -1,21 +1,51 @@
 from .solver import Solver
+from .external_memory import StatePacker, SortedRuns, ParentLog
+from .trace import TraceRecorder, NONE, GOAL, VISITED, DEADLOCK, LEARNED_DEADLOCK, NOT_SELECTED
 from sokoban.map import Map
 from . import heuristics
 
+import numpy as np
+import random
+import tempfile
+
 class BeamSearch(Solver):
 
-    def __init__(self, map: Map, beam_width: int, heuristic: callable, allow_pulls=False):
+    def __init__(self, map: Map, beam_width: int, heuristic: callable, allow_pulls=False,
+                 external_dir: str | None = None, seed: int | None = None, patience: int | None = None):
         super().__init__(map)
         self.beam_width = beam_width
         self.heuristic = heuristic
         self.allow_pulls = allow_pulls
+        # When set, the visited set, the beam layers and the parent links live in
+        # memory-mapped files under this directory instead of Python dicts and sets
+        self.external_dir = external_dir
+        # With a seed, states with equal heuristics are kept in a random order instead of generation order
+        self.seed = seed
+        # Give up after this many steps without improving the best heuristic (None: only when the beam empties)
+        self.patience = patience
         self.explored_states = 0
+        # Size of the visited set when the search stopped, also set when no goal was reached
+        self.visited_states = 0
+
+    def set_pull_budget(self, pull_budget: int):
+        if self.external_dir is not None:
+            raise ValueError('A pull budget is only supported by the in-memory search')
+        super().set_pull_budget(pull_budget)
+
+    def record_trace(self, trace: TraceRecorder):
+        if self.external_dir is not None:
+            raise ValueError('Tracing is only supported by the in-memory search')
+        super().record_trace(trace)
+
+    def stagnated(self, steps_without_improvement: int) -> bool:
+        return self.patience is not None and steps_without_improvement >= self.patience
 
     def solve(self):
         """
         Finds a solution using Beam Search. If goal is not reached,
         returns the path to the state with the best heuristic found.
         """
+        self.track_heuristic_state()
         initial_map_state = self.map
 
         # Check if initial state is solvable according to the heuristic for debugging purposes
@@ -27,6 +57,9 @@ class BeamSearch(Solver):
              print("Initial state is already solved.")
              return [initial_map_state.copy()]
 
+        if self.external_dir is not None:
+            return self.solve_external(initial_heuristic)
+
         initial_hashable_state = self.get_hashable_state(initial_map_state)
 
         visited = {initial_hashable_state}
@@ -35,24 +68,33 @@ class BeamSearch(Solver):
 
         best_heuristic_so_far = initial_heuristic
         best_state_hash_so_far = initial_hashable_state
+        steps_without_improvement = 0
+        rng = random.Random(self.seed) if self.seed is not None else None
 
         goal_hash = None
         i = 0
 
+        if self.trace is not None:
+            self.trace.record(initial_hashable_state, None, initial_heuristic, 0)
+
         # Beam stores: (heuristic_value, current_map_object)
         beam = [(initial_heuristic, initial_map_state)]
         while beam:
             candidates = []
             processed_in_step = set()
+            best_before_step = best_heuristic_so_far
 
             for _, current_map in beam:
                 current_hash = self.get_hashable_state(current_map)
 
-                neighbours = current_map.get_neighbours(allow_pulls=self.allow_pulls)
+                neighbours = self.prune_successors(current_map, current_map.get_neighbours(allow_pulls=self.allow_pulls), i + 1)
 
                 for neigh in neighbours:
                     neigh_hash = self.get_hashable_state(neigh)
-                    if neigh_hash not in visited and neigh_hash not in processed_in_step:
+                    if neigh_hash in visited or neigh_hash in processed_in_step:
+                        if self.trace is not None:
+                            self.trace.record(neigh_hash, current_hash, float('inf'), i + 1, VISITED)
+                    else:
                         processed_in_step.add(neigh_hash)
                         
                         # Avoid a two-way loop during reconstruction after a restarted search
@@ -62,6 +104,8 @@ class BeamSearch(Solver):
 
                         if neigh.is_solved():
                             goal_hash = neigh_hash
+                            if self.trace is not None:
+                                self.trace.record(neigh_hash, current_hash, 0, i + 1, GOAL)
                             print(f"Goal state found!\nExplored states: {len(visited)}")
                             # Only update this field if we find a goal solution so the state plots will have a value of 0
                             # if the algo failed to reach a goal
@@ -69,15 +113,22 @@ class BeamSearch(Solver):
                             beam = []
                             break
 
-                        neigh_heur = self.heuristic(neigh)
+                        learned_deadlock = self.is_learned_deadlock(current_map.positions_of_boxes, neigh)
+                        if learned_deadlock:
+                            neigh_heur = float('inf')
+                        else:
+                            neigh_heur = self.heuristic(neigh)
 
                         # Ignore deadlock positions
-                        if neigh_heur != float('inf'):
+                        if neigh_heur == float('inf'):
+                            if self.trace is not None:
+                                self.trace.record(neigh_hash, current_hash, neigh_heur, i + 1,
+                                                  LEARNED_DEADLOCK if learned_deadlock else DEADLOCK)
+                        else:
                             candidates.append((neigh_heur, neigh))
-                            # Keep track of the best heuristic so far in case we need to reconstruct a partial solution
+                            # Keep track of the best heuristic so far in case we need to reconstruct a partial solution.
+                            # Parent links are never overwritten, so remembering the state's hash is enough
                             if neigh_heur < best_heuristic_so_far:
-                                last_visited = visited.copy()
-                                last_parents = parents.copy()
                                 best_heuristic_so_far = neigh_heur
                                 best_state_hash_so_far = neigh_hash
 
@@ -86,15 +137,31 @@ class BeamSearch(Solver):
             if goal_hash is not None: break
 
             # Sort based on the heuristic and keep the top k states
-            candidates.sort(key=lambda state_tuple: state_tuple[0])
+            if rng is None:
+                candidates.sort(key=lambda state_tuple: state_tuple[0])
+            else:
+                candidates.sort(key=lambda state_tuple: (state_tuple[0], rng.random()))
             # print the heuristic values of the candidates
             beam = candidates[:self.beam_width]
 
             for _, map_obj in beam:
                 visited.add(self.get_hashable_state(map_obj))
 
+            if self.trace is not None:
+                for rank, (neigh_heur, map_obj) in enumerate(candidates):
+                    neigh_hash = self.get_hashable_state(map_obj)
+                    self.trace.record(neigh_hash, parents.get(neigh_hash), neigh_heur, i + 1,
+                                      NONE if rank < self.beam_width else NOT_SELECTED)
+
             i += 1
 
+            steps_without_improvement = 0 if best_heuristic_so_far < best_before_step else steps_without_improvement + 1
+            if self.stagnated(steps_without_improvement):
+                break
+
+        self.flush_trace()
+        self.visited_states = len(visited)
+
         # Check if we have a partial solution or a goal solution
         reconstruction_start_hash = None
         
@@ -122,4 +189,109 @@ class BeamSearch(Solver):
 
         state_sequence = list(reversed(state_sequence_reversed))
         print(f"Reconstructed path size: {len(state_sequence)}")
-        return state_sequence
\ No newline at end of file
+        return state_sequence
+
+    def solve_external(self, initial_heuristic):
+        """
+        Same search as solve(), but every beam layer is appended to a memory-mapped log
+        of packed fixed-width states with their parent indices, and the visited set is a
+        list of sorted runs on disk. Duplicates inside a step are removed by sorting the
+        packed candidates. Only the candidates of the current step are kept in memory.
+        """
+        initial_map_state = self.map
+        initial_hashable_state = self.get_hashable_state(initial_map_state)
+        packer = StatePacker(len(initial_map_state.positions_of_boxes))
+
+        with tempfile.TemporaryDirectory(dir=self.external_dir) as directory:
+            visited = SortedRuns(directory, packer)
+            layers = ParentLog(directory, packer)
+
+            root = packer.pack([initial_hashable_state])
+            layer_start = layers.append(root, [-1])
+            layer_end = layers.size
+            visited.add(root)
+
+            best_heuristic_so_far = initial_heuristic
+            best_index_so_far = layer_start
+            steps_without_improvement = 0
+            rng = np.random.default_rng(self.seed) if self.seed is not None else None
+            goal_path = None
+
+            while layer_end > layer_start and goal_path is None:
+                neigh_keys = []
+                neigh_parents = []
+                neigh_parent_boxes = []
+
+                for index, row in enumerate(layers.layer(layer_start, layer_end), start=layer_start):
+                    current_map = self.map_from_hashable_state(packer.unpack(row))
+                    neighbours = self.prune_successors(current_map, current_map.get_neighbours(allow_pulls=self.allow_pulls))
+                    for neigh in neighbours:
+                        neigh_keys.append(self.get_hashable_state(neigh))
+                        neigh_parents.append(index)
+                        neigh_parent_boxes.append(current_map.positions_of_boxes)
+
+                if not neigh_keys:
+                    break
+
+                rows = packer.pack(neigh_keys)
+                parents = np.array(neigh_parents, dtype=np.int64)
+
+                # Sort out the duplicates of this step (keeping the first one generated)
+                # and the states already visited in an earlier layer
+                _, first = np.unique(packer.as_keys(rows), return_index=True)
+                first.sort()
+                fresh = first[~visited.contains(rows[first])]
+
+                candidates = []
+                heurs = []
+                for i in fresh:
+                    neigh = self.map_from_hashable_state(neigh_keys[i])
+                    if neigh.is_solved():
+                        self.explored_states = len(visited)
+                        print(f"Goal state found!\nExplored states: {self.explored_states}")
+                        goal_path = layers.trace(int(parents[i])) + [neigh_keys[i]]
+                        break
+
+                    if self.is_learned_deadlock(neigh_parent_boxes[i], neigh):
+                        neigh_heur = float('inf')
+                    else:
+                        neigh_heur = self.heuristic(neigh)
+                    # Ignore deadlock positions
+                    if neigh_heur != float('inf'):
+                        candidates.append(i)
+                        heurs.append(neigh_heur)
+
+                if goal_path is not None or not candidates:
+                    break
+
+                # Keep the top k states, ties stay in generation order like in solve()
+                # unless they are shuffled by the seed
+                candidates = np.array(candidates)
+                if rng is None:
+                    order = np.argsort(np.array(heurs), kind='stable')
+                else:
+                    order = np.lexsort((rng.random(len(heurs)), np.array(heurs)))
+                order = order[:self.beam_width]
+                beam = candidates[order]
+
+                layer_start = layers.append(rows[beam], parents[beam])
+                layer_end = layers.size
+                visited.add(rows[beam])
+
+                if heurs[order[0]] < best_heuristic_so_far:
+                    best_heuristic_so_far = heurs[order[0]]
+                    best_index_so_far = layer_start
+                    steps_without_improvement = 0
+                else:
+                    steps_without_improvement += 1
+                    if self.stagnated(steps_without_improvement):
+                        break
+
+            self.visited_states = len(visited)
+            if goal_path is None:
+                print(f"Goal not reached. Reconstructing path to best state found (heuristic: {best_heuristic_so_far}).")
+                goal_path = layers.trace(best_index_so_far)
+
+        state_sequence = self.replay_hashable_path(goal_path, self.allow_pulls)
+        print(f"Reconstructed path size: {len(state_sequence)}")
+        return state_sequence
@@ -0,0 +1,127 @@
+from .reachability import MOVE_DELTAS
+from sokoban.map import Map
+
+from collections import deque
+
+
+def flood(start: tuple, passable) -> set:
+    """
+    4-connected flood from start over the squares passable() accepts
+    """
+    region = {start}
+    queue = deque([start])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in MOVE_DELTAS.values():
+            nxt = (x + dx, y + dy)
+            if nxt not in region and passable(nxt):
+                region.add(nxt)
+                queue.append(nxt)
+    return region
+
+def find_pi_corral(map_obj: Map) -> frozenset | None:
+    """
+    Returns the fence boxes of a PI-corral of the state, or None if there is none.
+
+    A corral is a part of the board the player can't reach, together with the boxes in it;
+    its fence is the boxes of the corral next to the player's region. Corrals that only touch
+    through boxes are merged. It is a PI-corral when:
+    - I: every push of a fence box from outside the corral goes into the corral, and
+    - P: the player can reach the square behind every such push right now.
+    Since a corral and the player's region touch only through boxes, every square outside the
+    corral next to a corral box is in the player's region and P holds by construction; pushes that
+    would start inside the corral need the player to get in first, so they don't count.
+    Corrals with every box on a target and no empty target are ignored, nothing has to enter them.
+
+    Whenever a PI-corral exists, some solution (if any) continues with a push of one of its
+    fence boxes, so the pushes of every other box can be pruned. This only holds without pulls.
+    When there are several, the one with the fewest fence boxes is returned.
+    """
+    level = map_obj.level
+    floor = level.floor
+    boxes = map_obj.positions_of_boxes
+    targets = level.target_set
+
+    player_region = flood((map_obj.player.x, map_obj.player.y),
+                          lambda pos: pos in floor and pos not in boxes)
+    if len(player_region) + len(boxes) == len(floor):
+        return None
+
+    def free(pos):
+        return pos in floor and pos not in boxes
+
+    best = None
+    seen = set(player_region)
+    for start in floor:
+        if start in seen or start in boxes:
+            continue
+
+        # Boxes are part of the flood, so corrals that only touch through boxes are merged
+        corral = flood(start, lambda pos: pos in floor and pos not in player_region)
+        seen |= corral
+
+        corral_boxes = [pos for pos in corral if pos in boxes]
+        if not any(pos not in targets for pos in corral_boxes) and \
+                not any(pos in targets and pos not in boxes for pos in corral):
+            continue
+
+        fence = []
+        is_pi = True
+        for bx, by in corral_boxes:
+            on_fence = False
+            for dx, dy in MOVE_DELTAS.values():
+                behind = (bx - dx, by - dy)
+                ahead = (bx + dx, by + dy)
+                on_fence = on_fence or behind in player_region
+                # I: a push the player can make right now must go into the corral
+                if behind in player_region and free(ahead) and ahead not in corral:
+                    is_pi = False
+                    break
+            if not is_pi:
+                break
+            if on_fence:
+                fence.append((bx, by))
+
+        if is_pi and fence and (best is None or len(fence) < len(best)):
+            best = frozenset(fence)
+
+    return best
+
+
+class CorralPruner:
+    """
+    Filters the successors of a state down to the pushes of its PI-corral fence boxes.
+    Moves that don't push anything are always kept.
+    """
+
+    def __init__(self):
+        self.expansions = 0
+        self.corrals = 0
+        self.pruned = 0
+
+    def filter(self, current_map: Map, neighbours: list) -> list:
+        self.expansions += 1
+        boxes = current_map.positions_of_boxes
+        if all(neigh.positions_of_boxes.keys() == boxes.keys() for neigh in neighbours):
+            return neighbours
+
+        fence = find_pi_corral(current_map)
+        if fence is None:
+            return neighbours
+        self.corrals += 1
+
+        kept = []
+        for neigh in neighbours:
+            moved = boxes.keys() - neigh.positions_of_boxes.keys()
+            if moved and not moved <= fence:
+                self.pruned += 1
+                continue
+            kept.append(neigh)
+        return kept
+
+    def stats(self) -> dict:
+        return {
+            'expansions': self.expansions,
+            'corrals': self.corrals,
+            'pruned': self.pruned,
+        }
@@ -0,0 +1,246 @@
+from .reachability import ReachabilityCache, is_free, push_successors
+from sokoban.map import Map
+
+from collections import deque
+from itertools import combinations
+import json
+import os
+
+# Cells around a box that can hold a box it interacts with
+NEIGHBOURHOOD = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+class DeadlockDatabase:
+    """
+    Store of small box patterns that are proven unsolvable on a level.
+
+    A pattern is a set of box positions such that, with only those boxes on the board,
+    no sequence of pushes gets all of them onto targets from any player position.
+    Adding boxes never helps, so every state containing a pattern is a deadlock.
+    Patterns are only valid for push-only search, since a pull can undo them.
+
+    Patterns are indexed by their smallest cell, so a state is matched by looking up
+    each of its boxes once. Probes that found a pattern solvable are remembered too,
+    so the same subset is never searched twice.
+    """
+
+    def __init__(self, max_pattern_size: int = 2, probe_budget: int = 2000):
+        self.max_pattern_size = max_pattern_size
+        self.probe_budget = probe_budget
+        self.patterns = set()
+        self.by_min_cell = {}
+        self.safe = set()
+        self.matched = 0
+        self.learned = 0
+
+    def add(self, pattern) -> bool:
+        pattern = frozenset(pattern)
+        if pattern in self.patterns:
+            return False
+
+        self.patterns.add(pattern)
+        self.by_min_cell.setdefault(min(pattern), []).append(pattern)
+        return True
+
+    def matches(self, box_positions) -> frozenset | None:
+        """
+        Returns a stored pattern contained in box_positions, or None
+        """
+        for box_pos in box_positions:
+            for pattern in self.by_min_cell.get(box_pos, ()):
+                if all(cell in box_positions for cell in pattern):
+                    self.matched += 1
+                    return pattern
+        return None
+
+    def check(self, parent_boxes, neigh: Map) -> bool:
+        """
+        Called by the solvers for every successor: True if it contains a known pattern,
+        or if probing the box that just moved (together with its neighbours) proves a new one.
+        """
+        boxes = neigh.positions_of_boxes
+        if self.matches(boxes) is not None:
+            return True
+
+        moved = [box_pos for box_pos in boxes if box_pos not in parent_boxes]
+        return bool(moved) and self.learn(neigh, moved[0])
+
+    def learn(self, map_obj: Map, box_pos: tuple) -> bool:
+        """
+        Probes the subsets made of box_pos and the boxes right next to it.
+        Records and returns True on the first one proven to be a deadlock.
+        """
+        x, y = box_pos
+        close_boxes = [
+            (x + dx, y + dy) for dx, dy in NEIGHBOURHOOD
+            if (x + dx, y + dy) in map_obj.positions_of_boxes
+        ]
+
+        for size in range(self.max_pattern_size):
+            for others in combinations(close_boxes, size):
+                subset = frozenset((box_pos,) + others)
+                if subset in self.safe:
+                    continue
+                if self.probe(map_obj, subset):
+                    self.add(subset)
+                    self.learned += 1
+                    return True
+                self.safe.add(subset)
+
+        return False
+
+    def probe(self, map_obj: Map, boxes: frozenset) -> bool:
+        """
+        Push-only BFS with only the given boxes on the board, started from every player region.
+        True if none of the searches gets all the boxes onto targets. Running out of
+        probe_budget counts as solvable, so a pattern is only recorded when it is proven.
+        """
+        targets = map_obj.level.target_set
+        if boxes <= targets:
+            return False
+
+        sub_map = Map.from_level(map_obj.level, 0, 0,
+                                 [(f'box{i}', x, y) for i, (x, y) in enumerate(sorted(boxes))])
+        reachability = ReachabilityCache()
+
+        seen = set()
+        queue = deque()
+        covered = set()
+        for x in range(sub_map.length):
+            for y in range(sub_map.width):
+                if (x, y) in covered or not is_free(sub_map, x, y, sub_map.positions_of_boxes):
+                    continue
+                start = sub_map.copy()
+                start.player.x, start.player.y = x, y
+                region = reachability.get(start)
+                covered |= region.cells
+                seen.add((region.normalized, tuple(sorted(boxes))))
+                queue.append((start, region))
+
+        while queue:
+            if len(seen) > self.probe_budget:
+                return False
+
+            state, region = queue.popleft()
+            for neigh, neigh_region in push_successors(state, reachability, region):
+                neigh_boxes = tuple(sorted(neigh.positions_of_boxes))
+                if all(box_pos in targets for box_pos in neigh_boxes):
+                    return False
+
+                key = (neigh_region.normalized, neigh_boxes)
+                if key in seen or any(corner_dead(neigh, box_pos, targets) for box_pos in neigh_boxes):
+                    continue
+
+                seen.add(key)
+                queue.append((neigh, neigh_region))
+
+        return True
+
+    def precompute(self, map_obj: Map):
+        """
+        Offline pass: probes every single floor square and every pair of adjacent squares.
+        Its own lookups don't count in matched, which only reports the search's.
+        """
+        matched = self.matched
+        floor = [
+            (x, y) for x in range(map_obj.length) for y in range(map_obj.width)
+            if not is_wall_square(map_obj, x, y)
+        ]
+        floor_set = set(floor)
+
+        subsets = [[cell] for cell in floor]
+        if self.max_pattern_size >= 2:
+            subsets += [
+                [cell, (cell[0] + dx, cell[1] + dy)]
+                for cell in floor for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1))
+                if (cell[0] + dx, cell[1] + dy) in floor_set
+            ]
+
+        for subset in subsets:
+            subset = frozenset(subset)
+            if subset in self.safe or self.matches(subset) is not None:
+                continue
+            if self.probe(map_obj, subset):
+                self.add(subset)
+            else:
+                self.safe.add(subset)
+
+        self.matched = matched
+
+    @staticmethod
+    def path_for(map_obj: Map, directory: str) -> str:
+        # Patterns only hold on the walls and targets they were proven on
+        return os.path.join(directory, f'{map_obj.level.fingerprint}.deadlocks.json')
+
+    def save(self, path: str, map_obj: Map):
+        """
+        Writes the patterns proven on the level of map_obj, along with its fingerprint
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, 'w') as file:
+            json.dump({
+                'fingerprint': map_obj.level.fingerprint,
+                'max_pattern_size': self.max_pattern_size,
+                'patterns': sorted(sorted(pattern) for pattern in self.patterns),
+            }, file)
+
+    @classmethod
+    def load(cls, path: str, map_obj: Map, **kwargs):
+        """
+        Reads patterns saved for the level of map_obj, raises ValueError if they were
+        proven on another level
+        """
+        with open(path, 'r') as file:
+            data = json.load(file)
+
+        if data.get('fingerprint') != map_obj.level.fingerprint:
+            raise ValueError(f'{path} holds deadlock patterns of another level')
+
+        db = cls(max_pattern_size=data['max_pattern_size'], **kwargs)
+        for pattern in data['patterns']:
+            db.add(tuple(cell) for cell in pattern)
+        return db
+
+    @classmethod
+    def load_or_precompute(cls, map_obj: Map, directory: str, **kwargs):
+        """
+        Loads the patterns saved for the level of map_obj under directory. If there are none,
+        or they belong to another level, runs precompute and saves the result there.
+        """
+        path = cls.path_for(map_obj, directory)
+        if os.path.exists(path):
+            try:
+                return cls.load(path, map_obj, **kwargs)
+            except ValueError:
+                pass
+
+        db = cls(**kwargs)
+        db.precompute(map_obj)
+        db.save(path, map_obj)
+        return db
+
+    def stats(self) -> dict:
+        return {
+            'patterns': len(self.patterns),
+            'safe': len(self.safe),
+            'matched': self.matched,
+            'learned': self.learned,
+        }
+
+
+def is_wall_square(map_obj: Map, x: int, y: int) -> bool:
+    ''' Walls and the outside of the map only, boxes on targets don't count here '''
+    return map_obj.level.is_wall(x, y)
+
+def corner_dead(map_obj: Map, box_pos: tuple, targets: set) -> bool:
+    ''' A box off its target, stuck between two orthogonal walls '''
+    if box_pos in targets:
+        return False
+
+    x, y = box_pos
+    vertical = is_wall_square(map_obj, x - 1, y) or is_wall_square(map_obj, x + 1, y)
+    horizontal = is_wall_square(map_obj, x, y - 1) or is_wall_square(map_obj, x, y + 1)
+    return vertical and horizontal
@@ -0,0 +1,182 @@
+import numpy as np
+import os
+
+
+class StatePacker:
+    """
+    Packs (player_pos, box_positions) keys into fixed-width rows of big-endian uint16,
+    so a row's raw bytes sort in the same order as the coordinates.
+    """
+
+    def __init__(self, num_boxes: int):
+        self.width = 2 + 2 * num_boxes
+        self.row_dtype = np.dtype('>u2')
+        # Sortable view of a whole row, used for sorting, searching and deduplication
+        self.key_dtype = np.dtype(f'S{2 * self.width}')
+
+    def pack(self, state_keys: list) -> np.ndarray:
+        rows = np.empty((len(state_keys), self.width), dtype=self.row_dtype)
+        for i, ((player_x, player_y), box_positions) in enumerate(state_keys):
+            rows[i, 0] = player_x
+            rows[i, 1] = player_y
+            rows[i, 2:] = [coord for box_pos in box_positions for coord in box_pos]
+        return rows
+
+    def unpack(self, row) -> tuple:
+        coords = [int(coord) for coord in row]
+        box_positions = tuple(zip(coords[2::2], coords[3::2]))
+        return ((coords[0], coords[1]), box_positions)
+
+    def as_keys(self, rows: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(rows, dtype=self.row_dtype).view(self.key_dtype).ravel()
+
+
+class SortedRuns:
+    """
+    Disk-backed set of packed states, stored as sorted runs in memory-mapped files.
+
+    Every add() writes a new sorted run. Runs are merged pairwise in chunks whenever
+    the newest one is at least as big as the one before it, so there are only
+    O(log n) runs to search and no merge ever needs the whole set in RAM.
+    """
+
+    def __init__(self, directory: str, packer: StatePacker, merge_chunk: int = 1 << 20):
+        self.directory = directory
+        self.packer = packer
+        self.merge_chunk = merge_chunk
+        self.runs = [] # list of (path, size)
+        self.next_run = 0
+
+    def run_keys(self, path: str, size: int) -> np.ndarray:
+        return np.memmap(path, dtype=self.packer.key_dtype, mode='r', shape=(size,))
+
+    def new_run_path(self) -> str:
+        path = os.path.join(self.directory, f'visited_{self.next_run}.bin')
+        self.next_run += 1
+        return path
+
+    def contains(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Boolean mask of the rows that are already in the set
+        """
+        return self.contains_keys(self.packer.as_keys(rows))
+
+    def contains_keys(self, keys: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(keys), dtype=bool)
+
+        for path, size in self.runs:
+            run = self.run_keys(path, size)
+            positions = np.searchsorted(run, keys)
+            in_range = positions < size
+            found[in_range] |= run[positions[in_range]] == keys[in_range]
+
+        return found
+
+    def add(self, rows: np.ndarray):
+        keys = np.unique(self.packer.as_keys(rows))
+        keys = keys[~self.contains_keys(keys)]
+        if len(keys) == 0:
+            return
+
+        path = self.new_run_path()
+        keys.tofile(path)
+        self.runs.append((path, len(keys)))
+
+        while len(self.runs) > 1 and self.runs[-1][1] >= self.runs[-2][1]:
+            newer = self.runs.pop()
+            older = self.runs.pop()
+            self.runs.append(self.merge(older, newer))
+
+    def merge(self, older: tuple, newer: tuple) -> tuple:
+        """
+        Chunked merge of two sorted runs into a new file, dropping duplicates
+        """
+        a = self.run_keys(*older)
+        b = self.run_keys(*newer)
+        path = self.new_run_path()
+
+        i = j = size = 0
+        last = None
+        with open(path, 'wb') as out:
+            while i < len(a) or j < len(b):
+                chunk_a = a[i:i + self.merge_chunk]
+                chunk_b = b[j:j + self.merge_chunk]
+
+                # Only emit what's below the smaller of the two chunk ends, the rest
+                # may still interleave with the next chunk of the other run
+                if len(chunk_a) and len(chunk_b):
+                    bound = min(chunk_a[-1], chunk_b[-1])
+                    take_a = np.searchsorted(chunk_a, bound, side='right')
+                    take_b = np.searchsorted(chunk_b, bound, side='right')
+                else:
+                    take_a, take_b = len(chunk_a), len(chunk_b)
+
+                merged = np.unique(np.concatenate([chunk_a[:take_a], chunk_b[:take_b]]))
+                if last is not None and len(merged) and merged[0] == last:
+                    merged = merged[1:]
+                if len(merged):
+                    merged.tofile(out)
+                    size += len(merged)
+                    last = merged[-1]
+
+                i += take_a
+                j += take_b
+
+        del a, b
+        os.remove(older[0])
+        os.remove(newer[0])
+        return (path, size)
+
+    def __len__(self):
+        return sum(size for _, size in self.runs)
+
+
+class ParentLog:
+    """
+    Append-only, disk-backed log of the frontier layers and their parent links.
+    Every row gets a global index; parents point to the global index of the state they came from.
+    """
+
+    def __init__(self, directory: str, packer: StatePacker):
+        self.packer = packer
+        self.states_path = os.path.join(directory, 'states.bin')
+        self.parents_path = os.path.join(directory, 'parents.bin')
+        self.size = 0
+        open(self.states_path, 'wb').close()
+        open(self.parents_path, 'wb').close()
+
+    def append(self, rows: np.ndarray, parents: np.ndarray) -> int:
+        """
+        Appends a layer and returns the global index of its first row
+        """
+        start = self.size
+        with open(self.states_path, 'ab') as states_file:
+            np.ascontiguousarray(rows, dtype=self.packer.row_dtype).tofile(states_file)
+        with open(self.parents_path, 'ab') as parents_file:
+            np.asarray(parents, dtype=np.int64).tofile(parents_file)
+        self.size += len(rows)
+        return start
+
+    def states(self) -> np.ndarray:
+        return np.memmap(self.states_path, dtype=self.packer.row_dtype, mode='r',
+                         shape=(self.size, self.packer.width))
+
+    def parents(self) -> np.ndarray:
+        return np.memmap(self.parents_path, dtype=np.int64, mode='r', shape=(self.size,))
+
+    def layer(self, start: int, end: int) -> np.ndarray:
+        return self.states()[start:end]
+
+    def trace(self, index: int) -> list:
+        """
+        State keys from the root of the log down to index
+        """
+        states = self.states()
+        parents = self.parents()
+
+        path_keys = []
+        while index >= 0:
+            path_keys.append(self.packer.unpack(states[index]))
+            index = int(parents[index])
+
+        return list(reversed(path_keys))
@@ -0,0 +1,64 @@
+from collections import deque
+import heapq
+
+
+class BucketQueue:
+    """
+    Priority queue for best-first frontiers with integer priorities (f or h values).
+
+    Every priority gets its own bucket, so we never compare two Map objects.
+    Pushing into an existing bucket and popping from a bucket that doesn't empty are O(1).
+    Creating or emptying a bucket costs O(log B) on a heap over the B distinct priorities,
+    which keeps sparse values (e.g. the 0xffffff fallback of the BFS heuristics) cheap where
+    an array indexed by priority would not be.
+    Ties inside a bucket are broken by insertion order: FIFO by default, LIFO if asked,
+    so the expansion order is deterministic between runs.
+    """
+
+    def __init__(self, lifo: bool = False):
+        self.buckets = {}
+        self.priorities = []
+        self.lifo = lifo
+        self.size = 0
+
+    def push(self, priority: int, item):
+        if not isinstance(priority, int) or priority < 0:
+            raise ValueError(f'BucketQueue priorities have to be non-negative integers, got {priority}')
+
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = deque()
+            heapq.heappush(self.priorities, priority)
+
+        bucket.append(item)
+        self.size += 1
+
+    def pop(self):
+        """
+        Removes and returns (priority, item) with the lowest priority
+        """
+        if self.size == 0:
+            raise IndexError('pop from an empty BucketQueue')
+
+        priority = self.priorities[0]
+        bucket = self.buckets[priority]
+        item = bucket.pop() if self.lifo else bucket.popleft()
+        self.size -= 1
+
+        if not bucket:
+            heapq.heappop(self.priorities)
+            del self.buckets[priority]
+
+        return priority, item
+
+    def peek_priority(self) -> int:
+        if self.size == 0:
+            raise IndexError('peek from an empty BucketQueue')
+
+        return self.priorities[0]
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
@@ -0,0 +1,160 @@
+"""
+Memory-bounded table of learned heuristic values, for long LrtaStar runs.
+
+Works like the H_table dict (state key -> value) but keeps 64-bit state ids and float32 values
+in open-addressed NumPy arrays sized once from a byte budget. When the table is full, the least
+valuable entries are evicted: the least recently used ones, or the ones whose value was raised
+the least by learning. The most recently used entries (the current state and its neighbours)
+are never evicted.
+"""
+from .trace import state_id, ID_MASK
+
+import math
+import numpy as np
+
+POLICIES = ('lru', 'increase')
+
+# Bytes per slot: key (uint64), value and learned increase (float32), last use (int64)
+SLOT_BYTES = 8 + 4 + 4 + 8
+# Entries per slot before evicting, linear probing slows down past that
+MAX_LOAD = 0.5
+# Share of the entries dropped at every eviction, so evictions stay rare
+EVICT_FRACTION = 0.25
+
+EMPTY = 0
+# Multiplier of the Fibonacci hash that picks the first slot
+SLOT_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class BoundedHTable:
+    """
+    Dict-like H_table with a memory cap. Keys are state keys (see Solver.get_hashable_state);
+    two states whose 64-bit ids collide share an entry. Values are rounded to float32.
+    """
+
+    def __init__(self, max_bytes: int, policy: str = 'lru', protected: int = 256):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown eviction policy {policy!r}, expected one of {POLICIES}')
+        slots = max_bytes // SLOT_BYTES
+        if slots < 16:
+            raise ValueError(f'max_bytes has to fit at least 16 slots of {SLOT_BYTES} bytes, got {max_bytes}')
+
+        self.policy = policy
+        # The entries used by the last `protected` accesses are kept by every eviction
+        self.protected = protected
+        bits = slots.bit_length() - 1
+        self.capacity = 1 << bits
+        self.shift = 64 - bits
+        self.max_entries = int(self.capacity * MAX_LOAD)
+
+        self.keys = np.zeros(self.capacity, dtype=np.uint64)
+        self.values = np.zeros(self.capacity, dtype=np.float32)
+        self.increases = np.zeros(self.capacity, dtype=np.float32)
+        self.last_used = np.zeros(self.capacity, dtype=np.int64)
+
+        self.size = 0
+        self.clock = 0
+        self.evictions = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key_id(state_key) -> int:
+        # 0 marks the empty slots
+        return state_id(state_key) or 1
+
+    def slot(self, key: int) -> int:
+        """
+        The slot holding key, or the empty slot where it would be inserted
+        """
+        keys = self.keys
+        mask = self.capacity - 1
+        i = ((key * SLOT_MULTIPLIER) & ID_MASK) >> self.shift
+        while True:
+            current = keys.item(i)
+            if current == key or current == EMPTY:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, state_key) -> bool:
+        return self.keys.item(self.slot(self.key_id(state_key))) != EMPTY
+
+    def __getitem__(self, state_key) -> float:
+        i = self.slot(self.key_id(state_key))
+        if self.keys.item(i) == EMPTY:
+            raise KeyError(state_key)
+        self.clock += 1
+        self.last_used[i] = self.clock
+        return self.values.item(i)
+
+    def get(self, state_key, default=None):
+        return self[state_key] if state_key in self else default
+
+    def __setitem__(self, state_key, value: float):
+        key = self.key_id(state_key)
+        i = self.slot(key)
+        if self.keys.item(i) == EMPTY:
+            if self.size >= self.max_entries:
+                self.evict()
+                i = self.slot(key)
+            self.keys[i] = key
+            self.increases[i] = 0
+            self.size += 1
+        else:
+            # How much learning raised the value since the state was first stored. Deadlocks
+            # (inf) don't raise anything measurable, and inf - inf would record NaN
+            old = self.values.item(i)
+            if math.isfinite(old) and math.isfinite(value):
+                self.increases[i] += value - old
+
+        self.clock += 1
+        self.values[i] = value
+        self.last_used[i] = self.clock
+
+    def __len__(self) -> int:
+        return self.size
+
+    def evict(self):
+        """
+        Drops EVICT_FRACTION of the entries, the least recently used or least increased ones
+        among those not used by the last `protected` accesses, and rehashes the rest
+        """
+        occupied = np.flatnonzero(self.keys != EMPTY)
+        candidates = occupied[self.last_used[occupied] <= self.clock - self.protected]
+        if len(candidates) == 0:
+            candidates = occupied
+
+        count = min(len(candidates), max(1, int(self.size * EVICT_FRACTION)))
+        scores = self.last_used[candidates] if self.policy == 'lru' else self.increases[candidates]
+        dropped = candidates[np.argpartition(scores, count - 1)[:count]]
+
+        keep = np.ones(self.capacity, dtype=bool)
+        keep[dropped] = False
+        kept = occupied[keep[occupied]]
+        keys, values = self.keys[kept], self.values[kept]
+        increases, last_used = self.increases[kept], self.last_used[kept]
+
+        # Linear probing can't just blank a slot, so the survivors are inserted again
+        self.keys[:] = EMPTY
+        for key, value, increase, used in zip(keys.tolist(), values, increases, last_used):
+            i = self.slot(key)
+            self.keys[i] = key
+            self.values[i] = value
+            self.increases[i] = increase
+            self.last_used[i] = used
+
+        self.size = len(kept)
+        self.evictions += 1
+        self.evicted += count
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.values.nbytes + self.increases.nbytes + self.last_used.nbytes
+
+    def stats(self) -> dict:
+        return {
+            'entries': self.size,
+            'capacity': self.capacity,
+            'bytes': self.nbytes,
+            'evictions': self.evictions,
+            'evicted': self.evicted,
+        }
@@ -0,0 +1,307 @@
+from .solver import Solver, map_from_key
+from .corrals import CorralPruner
+from .frontier import BucketQueue
+from .heuristic_cache import HeuristicCache
+from .heuristics import integer_scaled, HEURISTIC_SCALE
+from .reachability import ReachabilityCache
+from sokoban.map import Map
+
+from functools import partial
+import multiprocessing as mp
+import queue
+
+# How many nodes a worker expands before it looks at its inbox again
+EXPANSIONS_PER_ROUND = 32
+# How long the coordinator waits between two termination snapshots
+POLL_INTERVAL = 0.05
+# How long the coordinator waits for a worker to exit before terminating it
+JOIN_TIMEOUT = 5.0
+
+
+def owner_of(state_key: tuple, num_workers: int) -> int:
+    """
+    The worker that owns a state. Tuples of ints hash the same way in every
+    process, so all the workers agree on the partition.
+    """
+    return hash(state_key) % num_workers
+
+class HdaWorker:
+    """
+    One partition of the search. It owns the closed set (best g and parent) for the states
+    that hash to it, keeps its own open list and ships the states it generates for other
+    partitions in batches.
+    """
+
+    def __init__(self, worker_id, num_workers, initial_map, heuristic, allow_pulls, batch_size, corral_pruning,
+                 inboxes, results, stop, idle, sent, received, expanded, pruned):
+        self.worker_id = worker_id
+        self.num_workers = num_workers
+        self.initial_map = initial_map
+        self.heuristic = integer_scaled(heuristic)
+        self.allow_pulls = allow_pulls
+        self.batch_size = batch_size
+        self.corral_pruner = CorralPruner() if corral_pruning else None
+
+        self.inboxes = inboxes
+        self.inbox = inboxes[worker_id]
+        self.results = results
+        self.stop = stop
+
+        # Shared counters for the termination detection, each worker only writes its own slot
+        self.idle = idle
+        self.sent = sent
+        self.received = received
+        self.expanded = expanded
+        self.pruned = pruned
+
+        self.closed = {} # state_key -> (g, parent_key)
+        self.open_list = BucketQueue()
+        self.outboxes = [[] for _ in range(num_workers)]
+
+    def flush(self, owner: int):
+        if self.outboxes[owner]:
+            # Count the batch before it's in flight, so it's never missed by the coordinator
+            self.sent[self.worker_id] += 1
+            self.inboxes[owner].put(('states', self.outboxes[owner]))
+            self.outboxes[owner] = []
+
+    def flush_all(self):
+        for owner in range(self.num_workers):
+            self.flush(owner)
+
+    def send(self, state_key: tuple, g: int, parent_key: tuple):
+        owner = owner_of(state_key, self.num_workers)
+        if owner == self.worker_id:
+            self.receive(state_key, g, parent_key)
+            return
+
+        self.outboxes[owner].append((state_key, g, parent_key))
+        if len(self.outboxes[owner]) >= self.batch_size:
+            self.flush(owner)
+
+    def receive(self, state_key: tuple, g: int, parent_key: tuple):
+        known = self.closed.get(state_key)
+        if known is not None and known[0] <= g:
+            return
+
+        self.closed[state_key] = (g, parent_key)
+        state = map_from_key(self.initial_map, state_key)
+
+        if state.is_solved():
+            self.results.put(('goal', state_key))
+            return
+
+        h = self.heuristic(state)
+        # Ignore deadlock positions
+        if h != float('inf'):
+            self.open_list.push(g * HEURISTIC_SCALE + h, (state_key, g))
+
+    def handle(self, message) -> bool:
+        """
+        Processes one inbox message, returns False when the worker has to exit
+        """
+        kind = message[0]
+        if kind == 'states':
+            # Leave the idle state before the batch is counted as received
+            self.idle[self.worker_id] = 0
+            self.received[self.worker_id] += 1
+            if not self.stop.is_set():
+                for state_key, g, parent_key in message[1]:
+                    self.receive(state_key, g, parent_key)
+        elif kind == 'parent':
+            self.results.put(('parent', message[1], self.closed[message[1]][1]))
+        elif kind == 'exit':
+            # The search is over: batches or late goals still sitting in the queue buffers
+            # are dropped, instead of the feeder threads blocking the exit until someone reads them
+            for inbox in self.inboxes:
+                inbox.cancel_join_thread()
+            self.results.cancel_join_thread()
+            return False
+
+        return True
+
+    def expand(self):
+        for _ in range(EXPANSIONS_PER_ROUND):
+            if not self.open_list or self.stop.is_set():
+                break
+
+            _, (state_key, g) = self.open_list.pop()
+            # Skip entries that were reached again with a lower g
+            if self.closed[state_key][0] < g:
+                continue
+
+            self.expanded[self.worker_id] += 1
+            state = map_from_key(self.initial_map, state_key)
+            neighbours = state.get_neighbours(allow_pulls=self.allow_pulls)
+            if self.corral_pruner is not None:
+                neighbours = self.corral_pruner.filter(state, neighbours)
+                self.pruned[self.worker_id] = self.corral_pruner.pruned
+            for neigh in neighbours:
+                self.send(neigh.state_key(), g + 1, state_key)
+
+        self.flush_all()
+
+    def run(self):
+        while True:
+            try:
+                while True:
+                    if not self.handle(self.inbox.get_nowait()):
+                        return
+            except queue.Empty:
+                pass
+
+            if self.stop.is_set() or not self.open_list:
+                self.flush_all()
+                self.idle[self.worker_id] = 1
+                if not self.handle(self.inbox.get()):
+                    return
+                continue
+
+            self.expand()
+
+
+def run_worker(*args):
+    HdaWorker(*args).run()
+
+
+class HdaStar(Solver):
+    """
+    Hash-distributed best-first search (HDA*) over several processes.
+
+    Every state belongs to the worker picked by its hash, which owns that part of the closed set.
+    Generated states are sent to their owners in batches over queues, the search stops at the
+    first goal or when all workers are idle with no batch in flight, and the path is rebuilt
+    by asking the owners for the parent of each state.
+    """
+
+    def __init__(self, map: Map, heuristic: callable, num_workers: int | None = None, allow_pulls=False,
+                 batch_size: int = 64, heuristic_cache_size: int | None = None, corral_pruning=False,
+                 reachability_cache_size: int | None = None):
+        super().__init__(map)
+        self.heuristic = heuristic
+        self.num_workers = num_workers or mp.cpu_count()
+        self.allow_pulls = allow_pulls
+        self.batch_size = batch_size
+        # Every worker gets its own cache, the box-only values are still reused inside a partition
+        self.heuristic_cache_size = heuristic_cache_size
+        # Same for the player regions, for heuristics that take a reachability cache
+        self.reachability_cache_size = reachability_cache_size
+        if reachability_cache_size is not None:
+            self.use_reachability(ReachabilityCache(reachability_cache_size))
+        if corral_pruning:
+            self.enable_corral_pruning()
+        self.explored_states = 0
+
+    def set_pull_budget(self, pull_budget: int):
+        # The workers key the states they exchange by state_key(), which has no room for the budget
+        raise ValueError('A pull budget is not supported by HDA*')
+
+    def worker_heuristic(self):
+        heuristic = self.heuristic
+        if self.reachability is not None:
+            heuristic = partial(heuristic, reachability=ReachabilityCache(self.reachability_cache_size))
+        if self.heuristic_cache_size is not None:
+            heuristic = partial(heuristic, cache=HeuristicCache(self.heuristic_cache_size))
+        return heuristic
+
+    def solve(self):
+        initial_map_state = self.map
+
+        if self.heuristic(initial_map_state) == float('inf'):
+            print("Initial state is deadlocked according to heuristic.")
+            return None
+        if initial_map_state.is_solved():
+            print("Initial state is already solved.")
+            return [initial_map_state.copy()]
+
+        n = self.num_workers
+        ctx = mp.get_context()
+        inboxes = [ctx.Queue() for _ in range(n)]
+        results = ctx.Queue()
+        stop = ctx.Event()
+        idle = ctx.RawArray('b', n)
+        # The last slot of sent is the coordinator, which sends the initial state
+        sent = ctx.RawArray('q', n + 1)
+        received = ctx.RawArray('q', n)
+        expanded = ctx.RawArray('q', n)
+        pruned = ctx.RawArray('q', n)
+
+        workers = [
+            ctx.Process(target=run_worker, args=(
+                i, n, initial_map_state, self.worker_heuristic(), self.allow_pulls, self.batch_size,
+                self.corral_pruner is not None, inboxes, results, stop, idle, sent, received, expanded, pruned
+            ), daemon=True)
+            for i in range(n)
+        ]
+        for worker in workers:
+            worker.start()
+
+        root_key = self.get_hashable_state(initial_map_state)
+        sent[n] = 1
+        inboxes[owner_of(root_key, n)].put(('states', [(root_key, 0, None)]))
+
+        goal_key = self.wait_for_goal(results, stop, idle, sent, received)
+
+        path_keys = []
+        if goal_key is not None:
+            path_keys = self.trace_path(goal_key, inboxes, results)
+
+        # The exit message goes after everything else the coordinator sent, so it's the last one read
+        for inbox in inboxes:
+            inbox.put(('exit',))
+        for worker in workers:
+            worker.join(JOIN_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+
+        self.explored_states = sum(expanded)
+        if self.corral_pruner is not None:
+            # The workers prune, the coordinator's pruner only reports their total
+            self.corral_pruner.pruned = sum(pruned)
+
+        if goal_key is None:
+            print(f"HDA* exhausted the search space without reaching a goal.\nExplored states: {self.explored_states}")
+            return None
+
+        print(f"Goal state found!\nExplored states: {self.explored_states}")
+        state_sequence = self.replay_hashable_path(path_keys, self.allow_pulls)
+        print(f"Reconstructed path size: {len(state_sequence)}")
+        return state_sequence
+
+    def wait_for_goal(self, results, stop, idle, sent, received):
+        """
+        Returns the first goal reported by a worker, or None once the search is exhausted.
+        The search is over when two snapshots in a row see every worker idle and as many
+        batches received as sent, with nothing changing in between.
+        """
+        last_snapshot = None
+        while True:
+            try:
+                message = results.get(timeout=POLL_INTERVAL)
+                if message[0] == 'goal':
+                    stop.set()
+                    return message[1]
+            except queue.Empty:
+                snapshot = (all(idle), sum(sent), sum(received))
+                if snapshot[0] and snapshot[1] == snapshot[2] and snapshot == last_snapshot:
+                    return None
+                last_snapshot = snapshot
+
+    def trace_path(self, goal_key, inboxes, results) -> list:
+        """
+        Walks the parent links back from the goal, asking the owner of every state
+        """
+        path_keys = []
+        current_key = goal_key
+        while current_key is not None:
+            path_keys.append(current_key)
+            inboxes[owner_of(current_key, self.num_workers)].put(('parent', current_key))
+
+            # Other workers may still report goals they found in the meantime
+            message = results.get()
+            while message[0] != 'parent':
+                message = results.get()
+            current_key = message[2]
+
+        return list(reversed(path_keys))
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+
+class HeuristicCache:
+    """
+    Bounded LRU cache for the box-only part of the heuristics.
+
+    Most of our heuristics (deadlock check + min-weight matching) only depend on
+    where the boxes are, so the same value can be reused for every player position
+    and across solver runs. Keys include the level fingerprint, so one instance can be
+    shared between solvers working on different levels without mixing up their values.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def box_key(map_obj) -> tuple:
+        """
+        The level and box configuration of a state, independent of the player and box names
+        """
+        return (map_obj.level.fingerprint, tuple(sorted(map_obj.positions_of_boxes.keys())))
+
+    def get_or_compute(self, key, compute: callable):
+        """
+        Returns the cached value for key, calling compute() and storing its result on a miss
+        """
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        value = compute()
+        self.entries[key] = value
+
+        # Drop the least recently used entry once we're over the limit
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        return value
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate(),
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,15 +1,60 @@
-from scipy.optimize import linear_sum_assignment
 from sokoban.map import Map
+from .heuristic_cache import HeuristicCache
+from .reachability import ReachabilityCache
+from .push_distances import push_distance_table, nearest_push_table, UNREACHABLE
+from .packing import blocked_targets
 
 import numpy as np
-from collections import deque
+from collections import OrderedDict, deque
+from functools import wraps
 
 DIRS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
 
-def min_weight_euclidean(map_obj: Map) -> float | int:
+def linear_sum_assignment(cost_matrix):
+    """
+    scipy is only imported the first time a matching is needed, so importing
+    the heuristics (e.g. in a worker process) stays cheap
+    """
+    from scipy.optimize import linear_sum_assignment as scipy_linear_sum_assignment
+    return scipy_linear_sum_assignment(cost_matrix)
+
+# Default fixed-point scale for heuristics that feed a BucketQueue frontier
+HEURISTIC_SCALE = 10
+
+def integer_scaled(heuristic: callable, scale: int = HEURISTIC_SCALE) -> callable:
+    """
+    Wraps a heuristic so it returns round(h * scale) as an int, which can be used
+    directly as a bucket index. Deadlocks still come back as float('inf').
+    """
+    @wraps(heuristic)
+    def scaled(map_obj: Map, *args, **kwargs):
+        value = heuristic(map_obj, *args, **kwargs)
+        if value == float('inf'):
+            return value
+        return int(round(value * scale))
+
+    return scaled
+
+def cached_box_part(map_obj: Map, cache: HeuristicCache | None, name: str, compute: callable) -> float | int:
+    """
+    Runs the box-only part of a heuristic through the shared cache, if we were given one.
+    The key is the box configuration, so it's reused for every player position.
+    """
+    if cache is None:
+        return compute(map_obj)
+
+    return cache.get_or_compute((name, HeuristicCache.box_key(map_obj)), lambda: compute(map_obj))
+
+def min_weight_euclidean(map_obj: Map, cache: HeuristicCache | None = None) -> float | int:
     """
     Deadlock check + min-weight matching using the Euclidean distance
     """
+    return cached_box_part(map_obj, cache, 'euclidean', euclidean_matching)
+
+def euclidean_matching(map_obj: Map) -> float | int:
+    """
+    Box-only part of min_weight_euclidean
+    """
     if map_obj.is_deadlock():
         return float('inf')
 
@@ -31,10 +76,16 @@ def min_weight_euclidean(map_obj: Map) -> float | int:
 
     return min_total_distance
 
-def min_weight_manhattan(map_obj: Map) -> float | int:
+def min_weight_manhattan(map_obj: Map, cache: HeuristicCache | None = None) -> float | int:
     """
     Combines a deadlock check with min-weight matching using the Manhattan distance
     """
+    return cached_box_part(map_obj, cache, 'manhattan', manhattan_matching)
+
+def manhattan_matching(map_obj: Map) -> float | int:
+    """
+    Box-only part of min_weight_manhattan
+    """
     if map_obj.is_deadlock():
         return float('inf')
 
@@ -60,29 +111,18 @@ def min_weight_manhattan(map_obj: Map) -> float | int:
 
     return min_total_distance
 
-def min_weight_manhattan_with_player(map_obj: Map) -> float | int:
+def min_weight_manhattan_with_player(map_obj: Map, cache: HeuristicCache | None = None) -> float | int:
     """
     Improved min_weight: considers both box-target distances and player-box distances.
     """
-    if map_obj.is_deadlock():
+    # Same matching as min_weight_manhattan, so both share the cached value
+    min_total_distance = cached_box_part(map_obj, cache, 'manhattan', manhattan_matching)
+    if min_total_distance == float('inf'):
         return float('inf')
 
     box_positions = list(map_obj.positions_of_boxes.keys())
-    target_positions = list(map_obj.targets)
     player_position = (map_obj.player.x, map_obj.player.y)
 
-    # Create the cost matrix for boxes to targets
-    num_boxes = len(box_positions)
-    cost_matrix = np.full((num_boxes, num_boxes), float('inf'))
-
-    for i, b_pos in enumerate(box_positions):
-        for j, t_pos in enumerate(target_positions):
-            dist = abs(b_pos[0] - t_pos[0]) + abs(b_pos[1] - t_pos[1])
-            cost_matrix[i, j] = dist
-
-    row_ind, col_ind = linear_sum_assignment(cost_matrix)
-    min_total_distance = cost_matrix[row_ind, col_ind].sum()
-
     # player-to-box proximity penalty
     min_player_distance = min(
         abs(player_position[0] - b[0]) + abs(player_position[1] - b[1])
@@ -141,9 +181,38 @@ def bfs_player_to_nearest_box_adjacent(map_obj: Map, player_pos: tuple, box_posi
 
     return float('inf') # Player cannot reach any position adjacent to a box
 
-def min_weight_bfs_with_player(map_obj: Map):
+def min_weight_bfs_with_player(map_obj: Map, cache: HeuristicCache | None = None,
+                               reachability: ReachabilityCache | None = None):
     """
-    Calculates the min-weight matching using BFS for box-target distances
+    Calculates the min-weight matching using BFS for box-target distances.
+    With a reachability cache, the player distance comes from distances flooded once per
+    player region instead of a BFS from the player on every call.
+    """
+    # Same matching as min_weight_bfs, so both share the cached value
+    min_total_distance = cached_box_part(map_obj, cache, 'bfs', bfs_matching)
+    if min_total_distance == float('inf'):
+        return float('inf')
+
+    box_positions = list(map_obj.positions_of_boxes.keys())
+    player_position = (map_obj.player.x, map_obj.player.y)
+
+    # player-to-box proximity penalty
+    if reachability is not None:
+        min_player_distance = reachability.distance_to_boxes(map_obj)
+    else:
+        min_player_distance = bfs_player_to_nearest_box_adjacent(map_obj, player_position, box_positions)
+
+    return min_total_distance + 0.5 * min_player_distance
+
+def min_weight_bfs(map_obj: Map, cache: HeuristicCache | None = None):
+    """
+    Faster heuristic: one BFS per box finds distances to all targets.
+    """
+    return cached_box_part(map_obj, cache, 'bfs', bfs_matching)
+
+def bfs_matching(map_obj: Map):
+    """
+    Box-only part of min_weight_bfs
     """
 
     if map_obj.is_deadlock():
@@ -156,7 +225,7 @@ def min_weight_bfs_with_player(map_obj: Map):
     num_targets = len(target_positions)
     cost_matrix = np.full((num_boxes, num_targets), float(0xffffff))
 
-    # Populate the cost matrix with the BFS dist from each box to all targets
+    # Popoluate the cost matrix with the BFS dist from each box to all targets
     for i, start in enumerate(box_positions):
         visited = set()
         queue = deque()
@@ -184,54 +253,97 @@ def min_weight_bfs_with_player(map_obj: Map):
     row_ind, col_ind = linear_sum_assignment(cost_matrix)
     min_total_distance = cost_matrix[row_ind, col_ind].sum()
 
-    player_position = (map_obj.player.x, map_obj.player.y)
+    return min_total_distance
 
-    # player-to-box proximity penalty
-    min_player_distance = bfs_player_to_nearest_box_adjacent(map_obj, player_position, box_positions)
+# Cost of an empty grouped target that the boxes already packed around it have cut off
+PACKING_PENALTY = 10
 
-    return min_total_distance + 0.5 * min_player_distance
+def min_weight_bfs_packing(map_obj: Map, cache: HeuristicCache | None = None):
+    """
+    min_weight_bfs plus PACKING_PENALTY per grouped target that can no longer be filled
+    because of the boxes already on its group, so goal rooms get packed in a valid order
+    (see packing.py) instead of early boxes walling off the later targets.
+    """
+    min_total_distance = min_weight_bfs(map_obj, cache)
+    if min_total_distance == float('inf'):
+        return min_total_distance
 
-def min_weight_bfs(map_obj: Map):
+    return min_total_distance + PACKING_PENALTY * cached_box_part(map_obj, cache, 'packing', blocked_targets)
+
+def min_weight_push(map_obj: Map, cache: HeuristicCache | None = None):
     """
-    Faster heuristic: one BFS per box finds distances to all targets.
+    Min-weight matching on the precomputed push distances, which only let a box move
+    when the player has a free square to push it from.
     """
+    return cached_box_part(map_obj, cache, 'push', push_matching)
 
+def push_matching(map_obj: Map):
+    """
+    Box-only part of min_weight_push
+    """
     if map_obj.is_deadlock():
         return float('inf')
 
+    table = push_distance_table(map_obj)
     box_positions = list(map_obj.positions_of_boxes.keys())
-    target_positions = list(map_obj.targets)
 
-    num_boxes = len(box_positions)
-    num_targets = len(target_positions)
-    cost_matrix = np.full((num_boxes, num_targets), float(0xffffff))
+    # Best side for every box, since we don't know yet where the player will come from
+    cost_matrix = np.array([table[:, x, y, :].min(axis=1) for x, y in box_positions], dtype=float)
 
-    # Popoluate the cost matrix with the BFS dist from each box to all targets
-    for i, start in enumerate(box_positions):
-        visited = set()
-        queue = deque()
-        queue.append((start, 0))  # (pos, dist)
+    # A box that can't be pushed to any target is stuck for good
+    if (cost_matrix >= UNREACHABLE).all(axis=1).any():
+        return float('inf')
 
-        targets_found = set()
+    row_ind, col_ind = linear_sum_assignment(cost_matrix)
+    min_total_distance = cost_matrix[row_ind, col_ind].sum()
 
-        while queue and len(targets_found) < num_targets:
-            (x, y), dist = queue.popleft()
+    # The only matchings left need a box to go where it can't be pushed
+    if min_total_distance >= UNREACHABLE:
+        return float('inf')
 
-            if (x, y) in target_positions:
-                j = target_positions.index((x, y))
-                cost_matrix[i, j] = dist
-                targets_found.add((x, y))
-                continue  # can still expand this node to find targets
+    return min_total_distance
 
-            for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < map_obj.length) and (0 <= ny < map_obj.width):
-                    if (nx, ny) not in visited and  not map_obj.is_wall(nx, ny):
-                        visited.add((nx, ny))
-                        queue.append(((nx, ny), dist + 1))
+# nearest_push_table of the last levels as nested lists, which apply_move indexes faster than an array
+NEAREST_PUSH_ROWS = OrderedDict()
+NEAREST_PUSH_LEVELS = 64
+
+def nearest_push_rows(map_obj: Map) -> list:
+    fingerprint = map_obj.level.fingerprint
+    rows = NEAREST_PUSH_ROWS.get(fingerprint)
+    if rows is None:
+        rows = NEAREST_PUSH_ROWS[fingerprint] = nearest_push_table(map_obj).tolist()
+        if len(NEAREST_PUSH_ROWS) > NEAREST_PUSH_LEVELS:
+            NEAREST_PUSH_ROWS.popitem(last=False)
+    else:
+        NEAREST_PUSH_ROWS.move_to_end(fingerprint)
+    return rows
+
+def track_nearest_push(map_obj: Map):
+    """
+    Makes map_obj and every state derived from it keep the nearest_push sum up to date,
+    so the heuristic costs O(1) per successor. The solvers call it on their initial map
+    through nearest_push.track_state (see Solver.track_heuristic_state).
+    """
+    map_obj.track_distances(nearest_push_rows(map_obj))
 
+def nearest_push(map_obj: Map, cache: HeuristicCache | None = None):
+    """
+    Sum of the pushes that bring every box to its nearest target, ignoring the other boxes.
+    States tracked with track_nearest_push already carry the sum, the others are summed
+    from the table without being modified, so there is nothing to cache.
+    """
+    if map_obj.unplaced_boxes == 0:
+        return 0
 
-    row_ind, col_ind = linear_sum_assignment(cost_matrix)
-    min_total_distance = cost_matrix[row_ind, col_ind].sum()
+    rows = nearest_push_rows(map_obj)
+    if map_obj.distance_table is rows:
+        total = map_obj.distance_sum
+    else:
+        total = sum(rows[x][y] for x, y in map_obj.positions_of_boxes)
 
-    return min_total_distance
+    # A box on a dead square can't reach any target
+    if total >= UNREACHABLE:
+        return float('inf')
+    return total
+
+nearest_push.track_state = track_nearest_push
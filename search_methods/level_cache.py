@@ -0,0 +1,105 @@
+from sokoban.map import Map
+
+from collections import OrderedDict
+import numpy as np
+import os
+
+# Bump this whenever an artifact changes meaning, old files are then simply ignored
+CACHE_FORMAT_VERSION = 3
+
+# Environment variable pointing the default cache to a directory on disk
+CACHE_DIR_ENV = 'SOKOBAN_CACHE_DIR'
+
+
+def level_fingerprint(map_obj: Map) -> str:
+    """
+    Content hash of the static part of a level: its size, walls and targets.
+    Computed once by the Level shared between all the states of a solve.
+    """
+    return map_obj.level.fingerprint
+
+
+class LevelCache:
+    """
+    Content-addressed store for per-level analysis artifacts (distance tables, dead squares...).
+
+    Artifacts are NumPy arrays kept in memory and, if a directory is given, written to
+    <directory>/v<CACHE_FORMAT_VERSION>/<fingerprint>/<name>.npy. Files found there are
+    memory-mapped instead of recomputed, so repeat solves of a known level start instantly.
+    At most max_artifacts arrays stay in memory, the least recently used ones are dropped
+    first, so a long-lived process solving many levels doesn't grow without limit.
+    """
+
+    def __init__(self, directory: str | None = None, max_artifacts: int = 256):
+        self.directory = directory
+        self.max_artifacts = max_artifacts
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.loads = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def artifact_path(self, fingerprint: str, name: str) -> str:
+        return os.path.join(self.directory, f'v{CACHE_FORMAT_VERSION}', fingerprint, f'{name}.npy')
+
+    def get(self, map_obj: Map, name: str, compute: callable) -> np.ndarray:
+        """
+        Returns the artifact called name for the level of map_obj, calling compute(map_obj) only
+        if it's neither in memory nor on disk
+        """
+        fingerprint = level_fingerprint(map_obj)
+        key = (fingerprint, name)
+
+        if key in self.memory:
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        if self.directory is None:
+            self.misses += 1
+            return self.remember(key, compute(map_obj))
+
+        path = self.artifact_path(fingerprint, name)
+        if os.path.exists(path):
+            self.loads += 1
+        else:
+            self.misses += 1
+            array = np.asarray(compute(map_obj))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write to a temporary file first, so a concurrent reader never maps half a file
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as file:
+                np.save(file, array)
+            os.replace(tmp_path, path)
+
+        return self.remember(key, np.load(path, mmap_mode='r'))
+
+    def remember(self, key: tuple, array: np.ndarray) -> np.ndarray:
+        self.memory[key] = array
+        if len(self.memory) > self.max_artifacts:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+        return array
+
+    def stats(self) -> dict:
+        return {
+            'artifacts': len(self.memory),
+            'hits': self.hits,
+            'loads': self.loads,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+DEFAULT_LEVEL_CACHE = LevelCache(os.environ.get(CACHE_DIR_ENV))
+
+def default_level_cache() -> LevelCache:
+    return DEFAULT_LEVEL_CACHE
+
+def set_cache_dir(directory: str | None):
+    """
+    Points the default cache (used by the heuristics) to a directory, or back to memory only
+    """
+    global DEFAULT_LEVEL_CACHE
+    DEFAULT_LEVEL_CACHE = LevelCache(directory)
@@ -1,20 +1,29 @@
 from .solver import Solver
+from .h_table import BoundedHTable
+from .trace import NONE, GOAL, DEADLOCK, LEARNED_DEADLOCK, NOT_SELECTED
 from sokoban.map import Map
 from . import heuristics
 
 # We'll assume a standard cost for each possible move
-# since pull moves are automatically filtered out in map.py
 MOVE_COST = 4
+# Extra cost of a pull move, on top of MOVE_COST
+PULL_COST = 10
 
 class LrtaStar(Solver):
 
-    def __init__(self,map: Map, heuristic: callable, max_steps = 10000000, allow_pulls=False):
+    def __init__(self,map: Map, heuristic: callable, max_steps = 10000000, allow_pulls=False,
+                 pull_cost: float = PULL_COST, h_table_bytes: int | None = None, h_table_policy: str = 'lru'):
         super().__init__(map)
         self.heuristic = heuristic
-        self.H_table = {}
+        # H_table holds the learned values per full state, while a heuristic cache (use_heuristic_cache)
+        # holds the box-only part and can be shared by several solvers on the same level.
+        # With a memory cap, the least valuable entries are evicted once the table is full
+        self.H_table = {} if h_table_bytes is None else BoundedHTable(h_table_bytes, h_table_policy)
         self.explored_states = 0
         self.max_steps = max_steps
         self.allow_pulls = allow_pulls
+        # Each pull made costs pull_cost, and with set_pull_budget they are skipped once the budget runs out
+        self.pull_cost = pull_cost
 
     def get_from_heurs_table(self, state: Map):
         state_hash = self.get_hashable_state(state)
@@ -25,6 +34,7 @@ class LrtaStar(Solver):
         return self.H_table[state_hash]
 
     def solve(self):
+        self.track_heuristic_state()
         curr = self.map
         self.solution_path = [curr]
         curr_heur = self.heuristic(curr)
@@ -37,24 +47,34 @@ class LrtaStar(Solver):
             print("Initial state is already solved.")
             return [curr]
 
+        if self.trace is not None:
+            self.trace.record(self.get_hashable_state(curr), None, curr_heur, 0)
+
         steps = 0
         while steps < self.max_steps:
             if (curr.is_solved()):
                 print("LRTA* found a goal solution")
+                self.flush_trace()
                 return self.solution_path
 
             curr_hash = self.get_hashable_state(curr)
-            neighs = curr.get_neighbours(allow_pulls=self.allow_pulls)
+            neighs = self.prune_successors(curr, curr.get_neighbours(allow_pulls=self.allow_pulls), steps + 1)
             self.H_table[curr_hash] = self.heuristic(curr)
 
             min_lookahead_cost = float('inf')
             best_neigh = None
+            # (neighbour, h, learned deadlock) of this step, only kept for the trace
+            scored = []
 
             for neigh in neighs:
-                h_neigh = self.get_from_heurs_table(neigh)
+                learned_deadlock = self.is_learned_deadlock(curr.positions_of_boxes, neigh)
+                if learned_deadlock:
+                    h_neigh = float('inf')
+                else:
+                    h_neigh = self.get_from_heurs_table(neigh)
                 # Add a penalty if we get a pull move
                 if neigh.undo_moves > curr.undo_moves:
-                    h_neigh += 10
+                    h_neigh += self.pull_cost
 
                 lookahead_cost = None
                 if h_neigh == float('inf'):
@@ -65,10 +85,17 @@ class LrtaStar(Solver):
                 if lookahead_cost < min_lookahead_cost:
                     min_lookahead_cost = lookahead_cost
                     best_neigh = neigh
+
+                if self.trace is not None:
+                    scored.append((neigh, h_neigh, learned_deadlock))
+
+            if self.trace is not None:
+                self.trace_step(curr_hash, scored, best_neigh, steps + 1)
             
             # Some debugging in case every possible move leads to a deadlock
             if best_neigh is None or min_lookahead_cost == float('inf'):
                 print(f"LRTA* Stuck at an unavoidable deadlock.")
+                self.flush_trace()
                 return None
 
             self.H_table[curr_hash] = min_lookahead_cost
@@ -78,4 +105,15 @@ class LrtaStar(Solver):
             steps += 1
 
         print("LRTA* ran out of max_steps and failed to reach a goal solution.")
+        self.flush_trace()
         return self.solution_path
+
+    def trace_step(self, curr_hash, scored: list, best_neigh: Map | None, depth: int):
+        for neigh, h_neigh, learned_deadlock in scored:
+            if h_neigh == float('inf'):
+                reason = LEARNED_DEADLOCK if learned_deadlock else DEADLOCK
+            elif neigh is best_neigh:
+                reason = GOAL if neigh.is_solved() else NONE
+            else:
+                reason = NOT_SELECTED
+            self.trace.record(self.get_hashable_state(neigh), curr_hash, h_neigh, depth, reason)
@@ -0,0 +1,222 @@
+from .corrals import flood
+from .level_cache import LevelCache, default_level_cache
+from .reachability import MOVE_DELTAS
+from sokoban.level import Level
+from sokoban.map import Map
+
+from collections import deque
+from functools import lru_cache
+import numpy as np
+
+
+@lru_cache(maxsize=256)
+def target_groups(level: Level) -> tuple:
+    """
+    The targets that touch each other (4-adjacent) form a group, e.g. a goal room.
+    Only groups of at least 2 targets are returned, in a fixed order.
+    """
+    groups = []
+    seen = set()
+    for target in sorted(level.target_set):
+        if target in seen:
+            continue
+        group = {target}
+        queue = deque([target])
+        while queue:
+            x, y = queue.popleft()
+            for dx, dy in MOVE_DELTAS.values():
+                nxt = (x + dx, y + dy)
+                if nxt in level.target_set and nxt not in group:
+                    group.add(nxt)
+                    queue.append(nxt)
+        seen |= group
+        if len(group) > 1:
+            groups.append(tuple(sorted(group)))
+    return tuple(groups)
+
+@lru_cache(maxsize=256)
+def player_start(level: Level, group: tuple) -> tuple | None:
+    """
+    Where the player stands once the group is full: a square of the largest area left
+    off the group's targets. Pockets walled in by the group are not part of it.
+    """
+    free = level.floor - set(group)
+    best = set()
+    seen = set()
+    for start in sorted(free):
+        if start in seen:
+            continue
+        area = flood(start, lambda pos: pos in free)
+        seen |= area
+        if len(area) > len(best):
+            best = area
+    return min(best) if best else None
+
+def distances_from_group(level: Level, group: tuple) -> dict:
+    """
+    Walking distance from the group's targets to every floor square that can reach them
+    """
+    distances = dict.fromkeys(group, 0)
+    queue = deque(group)
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in MOVE_DELTAS.values():
+            nxt = (x + dx, y + dy)
+            if nxt in level.floor and nxt not in distances:
+                distances[nxt] = distances[(x, y)] + 1
+                queue.append(nxt)
+    return distances
+
+def removal_order(level: Level, group: tuple, filled: frozenset, removable: frozenset) -> list:
+    """
+    Retrograde analysis: starting with a box on every target of filled, repeatedly pulls a box
+    of removable off its target. A box at b can be pulled towards d when the player can reach
+    b + d and b + 2d is free to step back onto; the box is then left at b + d and the player
+    at b + 2d. Boxes already pulled out can be pulled further, but only away from the group,
+    to get them out of the way. The player starts at player_start() and only walks through
+    what it can reach from where it stands. Boxes outside the group are ignored.
+    Returns the targets in removal order.
+    """
+    start = player_start(level, group)
+    if start is None:
+        return []
+
+    distances = distances_from_group(level, group)
+    player = start
+    # Boxes still on their target, and the ones pulled out of the group
+    on_targets = set(filled)
+    parked = set()
+    order = []
+
+    def free(pos):
+        return pos in level.floor and pos not in on_targets and pos not in parked
+
+    def find_pull(boxes, useful):
+        # Everything the player can walk to from where it stands, with the boxes in place
+        region = flood(player, free)
+        for x, y in sorted(boxes):
+            for dx, dy in MOVE_DELTAS.values():
+                to, behind = (x + dx, y + dy), (x + 2 * dx, y + 2 * dy)
+                if to in region and behind in region and useful((x, y), to):
+                    return (x, y), to, behind
+        return None
+
+    while True:
+        pull = find_pull(on_targets & removable, lambda box, to: True)
+        if pull is not None:
+            box, to, player = pull
+            on_targets.remove(box)
+            order.append(box)
+        else:
+            # Make room by pulling a parked box further out, which can only happen finitely often
+            pull = find_pull(parked, lambda box, to: distances.get(to, -1) > distances.get(box, -1))
+            if pull is None:
+                return order
+            box, to, player = pull
+            parked.remove(box)
+        parked.add(to)
+
+def compute_packing_table(level: Level) -> np.ndarray:
+    """
+    table[0, x, y]: group index of the target at (x, y), -1 for squares outside a group.
+    table[1, x, y]: rank of that target in a valid packing order of its group (0 is filled first),
+    -1 if the group has no valid order.
+    """
+    table = np.full((2, level.length, level.width), -1, dtype=np.int32)
+    for g, group in enumerate(target_groups(level)):
+        order = removal_order(level, group, frozenset(group), frozenset(group))
+        packable = len(order) == len(group)
+        # Boxes go in in the reverse of the order they come out
+        for rank, (x, y) in enumerate(reversed(order)):
+            table[0, x, y] = g
+            table[1, x, y] = rank if packable else -1
+        for x, y in group:
+            table[0, x, y] = g
+    return table
+
+def packing_table(map_obj: Map, level_cache: LevelCache | None = None) -> np.ndarray:
+    level_cache = level_cache or default_level_cache()
+    return level_cache.get(map_obj, 'packing_order', lambda level_map: compute_packing_table(level_map.level))
+
+def packing_order(map_obj: Map) -> list:
+    """
+    Every target group with its targets in packing order (None if the group can't be packed)
+    """
+    table = packing_table(map_obj)
+    orders = []
+    for group in target_groups(map_obj.level):
+        ranks = [int(table[1, x, y]) for x, y in group]
+        orders.append(None if min(ranks) < 0 else [group[i] for i in np.argsort(ranks)])
+    return orders
+
+@lru_cache(maxsize=1 << 16)
+def blocked_in_group(level: Level, group: tuple, filled: frozenset) -> int:
+    """
+    How many empty targets of the group can no longer be filled, with boxes on filled:
+    the empty targets that can't be taken out again from the full group in retrograde
+    """
+    empty = frozenset(group) - filled
+    return len(empty) - len(removal_order(level, group, frozenset(group), empty))
+
+def in_transit(level: Level, group: tuple, boxes, target: tuple) -> bool:
+    """
+    Whether the box on target can still be pushed on to an empty target of its group, like a box
+    passing through the entrance of a goal room. Where the player stands is not checked.
+    """
+    x, y = target
+    for dx, dy in MOVE_DELTAS.values():
+        ahead, behind = (x + dx, y + dy), (x - dx, y - dy)
+        if (ahead in group and ahead not in boxes
+                and behind in level.floor and behind not in boxes):
+            return True
+    return False
+
+def blocked_targets(map_obj: Map) -> int:
+    """
+    Number of empty grouped targets cut off by the boxes already sitting on their group.
+    Boxes still on their way in (see in_transit) don't count as sitting there yet.
+    Groups filled along their precomputed packing order are fine by construction, only the
+    others go through the retrograde check.
+    """
+    level = map_obj.level
+    boxes = map_obj.positions_of_boxes
+    ranks = packing_table(map_obj)[1]
+    blocked = 0
+    for group in target_groups(level):
+        filled = frozenset(target for target in group
+                           if target in boxes and not in_transit(level, group, boxes, target))
+        if not filled or len(filled) == len(group):
+            continue
+        # Unpackable groups have every rank at -1 and never take this shortcut
+        if max(ranks[x, y] for x, y in filled) < min(ranks[x, y] for x, y in group if (x, y) not in filled):
+            continue
+        blocked += blocked_in_group(level, group, filled)
+    return blocked
+
+
+class PackingPruner:
+    """
+    Filters out the successors that move a box onto a grouped target out of packing order,
+    i.e. that cut off more empty targets of the groups than the current state does.
+    Every other move is kept.
+    """
+
+    def __init__(self):
+        self.pruned = 0
+
+    def filter(self, current_map: Map, neighbours: list) -> list:
+        groups = packing_table(current_map)[0]
+        blocked = None
+
+        kept = []
+        for neigh in neighbours:
+            if neigh.moved_box is not None:
+                box = neigh.boxes[neigh.moved_box]
+                if groups[box.x, box.y] >= 0:
+                    if blocked is None:
+                        blocked = blocked_targets(current_map)
+                    if blocked_targets(neigh) > blocked:
+                        self.pruned += 1
+                        continue
+            kept.append(neigh)
+        return kept
@@ -0,0 +1,142 @@
+from .level_cache import LevelCache, default_level_cache
+from sokoban.map import Map
+
+from collections import deque
+import numpy as np
+
+# Same order as heuristics.DIRS; side s of a box at c is the square c + DIRS[s]
+DIRS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+UNREACHABLE = 0xffffff
+
+
+def floor_squares(map_obj: Map) -> frozenset:
+    return map_obj.level.floor
+
+def side_components(floor: set, cell: tuple) -> list:
+    """
+    With a box on cell, tells which of its 4 sides the player can walk between.
+    Returns a component id per side (None for walls); equal ids are connected.
+    """
+    x, y = cell
+    sides = [(x + dx, y + dy) for dx, dy in DIRS]
+    components = [None] * len(sides)
+
+    next_id = 0
+    for s, start in enumerate(sides):
+        if start not in floor or components[s] is not None:
+            continue
+
+        components[s] = next_id
+        pending = {side for k, side in enumerate(sides) if side in floor and components[k] is None}
+        seen = {start, cell}
+        queue = deque([start])
+
+        # Flood until every other side was found, or the component is exhausted
+        while queue and pending:
+            cx, cy = queue.popleft()
+            for dx, dy in DIRS:
+                nxt = (cx + dx, cy + dy)
+                if nxt in floor and nxt not in seen:
+                    seen.add(nxt)
+                    queue.append(nxt)
+                    if nxt in pending:
+                        pending.discard(nxt)
+                        components[sides.index(nxt)] = next_id
+
+        next_id += 1
+
+    return components
+
+def compute_side_components(map_obj: Map) -> np.ndarray:
+    """
+    components[x, y, s]: side_components() of every floor square, -1 for walls
+    """
+    floor = floor_squares(map_obj)
+    components = np.full((map_obj.length, map_obj.width, len(DIRS)), -1, dtype=np.int8)
+    for x, y in floor:
+        components[x, y] = [-1 if comp is None else comp for comp in side_components(floor, (x, y))]
+    return components
+
+def compute_push_distances(map_obj: Map, components: np.ndarray | None = None) -> np.ndarray:
+    """
+    table[t, x, y, s]: fewest pushes that bring a box from (x, y) onto target t,
+    with the player starting on side s of the box. Only walls are taken into account.
+    The player has to stand on the free square behind the box for every push,
+    and can only move around the box through squares that don't need the box's cell.
+    """
+    floor = floor_squares(map_obj)
+    if components is None:
+        components = compute_side_components(map_obj)
+    table = np.full((len(map_obj.targets), map_obj.length, map_obj.width, len(DIRS)), UNREACHABLE, dtype=np.int32)
+
+    for t, target in enumerate(map_obj.targets):
+        target = tuple(target)
+        dist = table[t]
+        queue = deque()
+        for s in range(len(DIRS)):
+            dist[target[0], target[1], s] = 0
+            queue.append((target, s))
+
+        # 0-1 BFS backwards: walking around the box is free, un-pushing costs 1
+        while queue:
+            cell, s = queue.popleft()
+            d = dist[cell[0], cell[1], s]
+
+            comp = components[cell[0], cell[1], s]
+            if comp >= 0:
+                for other, other_comp in enumerate(components[cell[0], cell[1]]):
+                    if other_comp == comp and dist[cell[0], cell[1], other] > d:
+                        dist[cell[0], cell[1], other] = d
+                        queue.appendleft((cell, other))
+
+            # The box came from the player's side, pushed by a player standing one further
+            dx, dy = DIRS[s]
+            before = (cell[0] + dx, cell[1] + dy)
+            behind = (cell[0] + 2 * dx, cell[1] + 2 * dy)
+            if before in floor and behind in floor and dist[before[0], before[1], s] > d + 1:
+                dist[before[0], before[1], s] = d + 1
+                queue.append((before, s))
+
+    return table
+
+def side_component_table(map_obj: Map, level_cache: LevelCache | None = None) -> np.ndarray:
+    level_cache = level_cache or default_level_cache()
+    return level_cache.get(map_obj, 'side_components', compute_side_components)
+
+def push_distance_table(map_obj: Map, level_cache: LevelCache | None = None) -> np.ndarray:
+    """
+    The push distance table of the level, computed once per level and loaded from
+    the level cache afterwards
+    """
+    level_cache = level_cache or default_level_cache()
+    return level_cache.get(
+        map_obj, 'push_distances',
+        lambda level: compute_push_distances(level, side_component_table(level, level_cache))
+    )
+
+def nearest_push_table(map_obj: Map, level_cache: LevelCache | None = None) -> np.ndarray:
+    """
+    nearest[x, y]: fewest pushes from (x, y) to the closest target, from the best side,
+    UNREACHABLE for dead squares and walls
+    """
+    level_cache = level_cache or default_level_cache()
+    return level_cache.get(
+        map_obj, 'nearest_push_distances',
+        lambda level: push_distance_table(level, level_cache).min(axis=(0, 3))
+    )
+
+def dead_square_table(map_obj: Map, level_cache: LevelCache | None = None) -> np.ndarray:
+    """
+    dead[x, y]: True for floor squares from which a box can't be pushed onto any target
+    """
+    level_cache = level_cache or default_level_cache()
+
+    def compute(level):
+        table = push_distance_table(level, level_cache)
+        floor = np.ones((level.length, level.width), dtype=bool)
+        for x, y in level.obstacles:
+            floor[x, y] = False
+        return floor & (table.min(axis=(0, 3)) >= UNREACHABLE)
+
+    return level_cache.get(map_obj, 'dead_squares', compute)
@@ -0,0 +1,297 @@
+from sokoban.map import Map
+from sokoban.moves import LEFT, RIGHT, UP, DOWN
+
+from collections import OrderedDict, deque
+
+# Player moves and the (dx, dy) they apply, as in Dummy.get_future_position
+MOVE_DELTAS = {
+    LEFT: (0, -1),
+    RIGHT: (0, 1),
+    DOWN: (-1, 0),
+    UP: (1, 0),
+}
+
+# The 8 cells around a square in cyclic order, each one 4-adjacent to the next
+RING = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+
+
+class Reachability:
+    """
+    The region the player can walk to for a given box configuration.
+
+    Attributes:
+    cells: frozenset of the squares the player can reach without pushing anything
+    normalized: top-left square of the region, a canonical player position for it
+    push_positions: list of (player_pos, box_pos, move) for every push the player can make
+    box_distances: walking distance from every cell to the nearest free square next to a box,
+    filled on demand by ReachabilityCache.distance_to_boxes (None until then)
+    """
+
+    def __init__(self, map_obj: Map, cells: frozenset):
+        self.cells = cells
+        self.normalized = min(cells)
+        self.push_positions = find_push_positions(map_obj, cells)
+        self.box_distances = None
+
+    def __contains__(self, pos):
+        return pos in self.cells
+
+    def __len__(self):
+        return len(self.cells)
+
+
+def is_free(map_obj: Map, x: int, y: int, boxes) -> bool:
+    ''' A square the player (or a box) can move onto '''
+    return not map_obj.is_wall(x, y) and (x, y) not in boxes
+
+def flood_player_region(map_obj: Map, start: tuple, boxes) -> frozenset:
+    """
+    BFS over the squares reachable from start, with boxes and walls as obstacles
+    """
+    region = {start}
+    queue = deque([start])
+
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in MOVE_DELTAS.values():
+            nx, ny = x + dx, y + dy
+            if (nx, ny) not in region and is_free(map_obj, nx, ny, boxes):
+                region.add((nx, ny))
+                queue.append((nx, ny))
+
+    return frozenset(region)
+
+def flood_box_distances(map_obj: Map, cells: frozenset) -> dict:
+    """
+    Multi-source BFS inside a region, from its squares next to a box. Cells that can't
+    reach any box are left out.
+    """
+    boxes = map_obj.positions_of_boxes
+    distances = {}
+    queue = deque()
+    for bx, by in boxes:
+        for dx, dy in MOVE_DELTAS.values():
+            pos = (bx + dx, by + dy)
+            if pos in cells and pos not in distances:
+                distances[pos] = 0
+                queue.append(pos)
+
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in MOVE_DELTAS.values():
+            nxt = (x + dx, y + dy)
+            if nxt in cells and nxt not in distances:
+                distances[nxt] = distances[(x, y)] + 1
+                queue.append(nxt)
+
+    return distances
+
+def find_push_positions(map_obj: Map, cells: frozenset) -> list:
+    """
+    All the pushes available from a region: the player stands next to a box,
+    inside the region, and the square behind the box is free.
+    """
+    boxes = map_obj.positions_of_boxes
+    pushes = []
+
+    for bx, by in boxes:
+        for move, (dx, dy) in MOVE_DELTAS.items():
+            player_pos = (bx - dx, by - dy)
+            if player_pos in cells and is_free(map_obj, bx + dx, by + dy, boxes):
+                pushes.append((player_pos, (bx, by), move))
+
+    return pushes
+
+def locally_connected(map_obj: Map, pos: tuple, boxes) -> bool:
+    """
+    Checks if the free neighbours of pos stay connected through the 8 squares around it.
+    If they do, blocking pos can't split the region it belongs to.
+    """
+    x, y = pos
+    free = [is_free(map_obj, x + dx, y + dy, boxes) for dx, dy in RING]
+
+    # Find the runs of consecutive free squares around pos; the orthogonal
+    # neighbours (even indices) all have to be in the same run
+    run_of = [None] * len(RING)
+    run = 0
+    start = next((i for i in range(len(RING)) if not free[i]), None)
+    if start is None:
+        return True
+
+    for k in range(1, len(RING) + 1):
+        i = (start + k) % len(RING)
+        if free[i]:
+            run_of[i] = run
+        else:
+            run += 1
+
+    runs = {run_of[i] for i in range(0, len(RING), 2) if free[i]}
+    return len(runs) <= 1
+
+
+class ReachabilityCache:
+    """
+    Caches the player regions per box configuration.
+
+    A configuration can have several regions, so each key holds a small list and a lookup
+    checks which one contains the player. Keys include the level fingerprint, so one cache
+    can be shared between levels. After a push whose previous region is cached, after_push()
+    derives the new region from it and only floods the map again when the push could have
+    split or merged regions.
+    """
+
+    def __init__(self, max_configs: int = 100000):
+        self.max_configs = max_configs
+        self.regions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.incremental = 0
+        self.distance_floods = 0
+
+    @staticmethod
+    def box_key(map_obj: Map) -> tuple:
+        return (map_obj.level.fingerprint, tuple(sorted(map_obj.positions_of_boxes.keys())))
+
+    def lookup(self, key: tuple, player_pos: tuple) -> Reachability | None:
+        for region in self.regions.get(key, ()):
+            if player_pos in region.cells:
+                self.regions.move_to_end(key)
+                return region
+        return None
+
+    def store(self, key: tuple, region: Reachability):
+        self.regions.setdefault(key, []).append(region)
+        self.regions.move_to_end(key)
+        if len(self.regions) > self.max_configs:
+            self.regions.popitem(last=False)
+
+    def get(self, map_obj: Map) -> Reachability:
+        """
+        Returns the region of the player in map_obj. On a miss, the region is derived from the
+        one before the last push if that one is cached, otherwise the map is flooded.
+        """
+        key = self.box_key(map_obj)
+        player_pos = (map_obj.player.x, map_obj.player.y)
+
+        region = self.lookup(key, player_pos)
+        if region is not None:
+            self.hits += 1
+            return region
+
+        before = self.before_push(map_obj)
+        if before is not None:
+            return self.after_push(*before)
+
+        self.misses += 1
+        region = Reachability(map_obj, flood_player_region(map_obj, player_pos, map_obj.positions_of_boxes))
+        self.store(key, region)
+        return region
+
+    def distance_to_boxes(self, map_obj: Map) -> float | int:
+        """
+        Walking distance from the player to the nearest free square next to a box.
+        The distances are flooded once per region, every other player position in it is a lookup.
+        """
+        region = self.get(map_obj)
+        if region.box_distances is None:
+            self.distance_floods += 1
+            region.box_distances = flood_box_distances(map_obj, region.cells)
+        return region.box_distances.get((map_obj.player.x, map_obj.player.y), float('inf'))
+
+    @property
+    def floods(self) -> int:
+        """
+        Every BFS run so far: player regions and box distances
+        """
+        return self.misses + self.distance_floods
+
+    def before_push(self, map_obj: Map) -> tuple | None:
+        """
+        If the box moved last sits right next to the player, map_obj can be reached by pushing it
+        from the player's square. Returns the after_push arguments for that push when the region
+        the player had before it is cached, None otherwise. Any push leading to map_obj gives
+        its region, so this holds even if map_obj was actually reached by a pull.
+        """
+        if map_obj.moved_box is None:
+            return None
+
+        box = map_obj.boxes[map_obj.moved_box]
+        old_box = (map_obj.player.x, map_obj.player.y)
+        new_box = (box.x, box.y)
+        dx, dy = new_box[0] - old_box[0], new_box[1] - old_box[1]
+        if abs(dx) + abs(dy) != 1:
+            return None
+
+        boxes = tuple(sorted(old_box if pos == new_box else pos for pos in map_obj.positions_of_boxes))
+        previous = self.lookup((map_obj.level.fingerprint, boxes), (old_box[0] - dx, old_box[1] - dy))
+        if previous is None:
+            return None
+        return previous, map_obj, old_box, new_box
+
+    def after_push(self, previous: Reachability, map_obj: Map, old_box: tuple, new_box: tuple) -> Reachability:
+        """
+        Region of the player in map_obj, which was reached by pushing a box from old_box
+        to new_box while the player stood inside previous.
+        """
+        key = self.box_key(map_obj)
+        player_pos = (map_obj.player.x, map_obj.player.y)
+
+        region = self.lookup(key, player_pos)
+        if region is not None:
+            self.hits += 1
+            return region
+
+        boxes = map_obj.positions_of_boxes
+
+        # The freed square merges regions if it touches a free square we couldn't reach before
+        merged = any(
+            (old_box[0] + dx, old_box[1] + dy) not in previous.cells
+            and is_free(map_obj, old_box[0] + dx, old_box[1] + dy, boxes)
+            for dx, dy in MOVE_DELTAS.values()
+        )
+        # The box can only split the region if it moved onto a reachable square
+        # which was holding it together
+        split = new_box in previous.cells and not locally_connected(map_obj, new_box, boxes)
+
+        if merged or split:
+            self.misses += 1
+            cells = flood_player_region(map_obj, player_pos, boxes)
+        else:
+            self.incremental += 1
+            cells = (previous.cells - {new_box}) | {old_box}
+
+        region = Reachability(map_obj, cells)
+        self.store(key, region)
+        return region
+
+    def stats(self) -> dict:
+        return {
+            'configs': len(self.regions),
+            'hits': self.hits,
+            'misses': self.misses,
+            'incremental': self.incremental,
+            'distance_floods': self.distance_floods,
+            'floods': self.floods,
+        }
+
+
+def push_successors(map_obj: Map, reachability: ReachabilityCache, region: Reachability | None = None) -> list:
+    """
+    Push-level successor generator: for every reachable push, returns the state after
+    walking to the push position and pushing once, paired with its (already derived) region.
+    Walking moves are not materialized, so these states skip the player steps in between.
+    """
+    if region is None:
+        region = reachability.get(map_obj)
+
+    successors = []
+    for player_pos, box_pos, move in region.push_positions:
+        new_map = map_obj.copy()
+        new_map.player.x, new_map.player.y = player_pos
+        new_map.apply_move(move)
+
+        dx, dy = MOVE_DELTAS[move]
+        new_box = (box_pos[0] + dx, box_pos[1] + dy)
+        successors.append((new_map, reachability.after_push(region, new_map, box_pos, new_box)))
+
+    return successors
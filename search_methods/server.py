@@ -0,0 +1,408 @@
+"""
+Local JSON-over-HTTP solving service.
+
+    POST /solve    {"level": {...yaml fields...} | "text": "...", "algorithm": "beam", "heuristic": "min_weight_bfs", ...}
+    GET  /metrics  queue depth, latency histograms, cache and coalescing counters
+    GET  /health
+
+Solves run in a process pool. Concurrent requests for the same puzzle and options share a
+single solve, and finished solutions are kept in an LRU cache.
+
+Usage: python -m search_methods.server [--host 127.0.0.1] [--port 8765 | --unix PATH] [--workers N]
+"""
+from .solver import Solver
+from .beam_search import BeamSearch
+from .adaptive_beam import AdaptiveBeamSearch
+from .lrta_star import LrtaStar
+from . import heuristics
+from sokoban.map import Map
+from sokoban.replay import moves_from_path
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import argparse
+import asyncio
+import bisect
+import io
+import json
+import multiprocessing
+import os
+import time
+
+HEURISTICS = {
+    name: getattr(heuristics, name) for name in (
+        'min_weight_euclidean', 'min_weight_manhattan', 'min_weight_manhattan_with_player',
+        'min_weight_bfs', 'min_weight_bfs_with_player', 'min_weight_bfs_packing', 'min_weight_push',
+        'nearest_push',
+    )
+}
+ALGORITHMS = ('beam', 'adaptive', 'lrta')
+
+# Upper bounds (seconds) of the latency histogram buckets, the last one catches everything
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf')]
+
+MAX_BODY_SIZE = 1 << 20
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_request(payload: dict) -> tuple:
+    """
+    Validates a /solve payload, returns the initial map and the solver options
+    """
+    try:
+        if 'level' in payload:
+            map_obj = Map.from_dict(payload['level'], test_name=payload.get('name', 'request'))
+        elif 'text' in payload:
+            map_obj = Map.from_str(payload['text'])
+        else:
+            raise RequestError(400, 'Expected a "level" object or a "text" board')
+    except (KeyError, TypeError, ValueError, IndexError, AttributeError) as error:
+        raise RequestError(400, f'Invalid level: {error!r}')
+    check_level(map_obj)
+
+    options = {
+        'algorithm': payload.get('algorithm', 'beam'),
+        'heuristic': payload.get('heuristic', 'min_weight_bfs'),
+        'beam_width': positive_int(payload, 'beam_width', 10),
+        'allow_pulls': bool(payload.get('allow_pulls', False)),
+        'max_steps': positive_int(payload, 'max_steps', 100000),
+    }
+    if options['algorithm'] not in ALGORITHMS:
+        raise RequestError(400, f'Unknown algorithm {options["algorithm"]!r}, expected one of {ALGORITHMS}')
+    if options['heuristic'] not in HEURISTICS:
+        raise RequestError(400, f'Unknown heuristic {options["heuristic"]!r}, expected one of {sorted(HEURISTICS)}')
+
+    return map_obj, options
+
+def check_level(map_obj: Map):
+    """
+    Rejects boards the solvers can't work on: no player, a player or box off the floor, or
+    a box count that doesn't match the target count
+    """
+    level = map_obj.level
+    player = (map_obj.player.x, map_obj.player.y)
+    if not all(isinstance(coordinate, int) for coordinate in player):
+        raise RequestError(400, 'Invalid level: no player')
+    if player not in level.floor:
+        raise RequestError(400, f'Invalid level: player at {player} is not on the floor')
+    for position in map_obj.positions_of_boxes:
+        if position not in level.floor or position == player:
+            raise RequestError(400, f'Invalid level: box at {position} is not on a free floor square')
+    if len(map_obj.positions_of_boxes) != len(level.target_set):
+        raise RequestError(400, f'Invalid level: {len(map_obj.positions_of_boxes)} boxes '
+                                f'for {len(level.target_set)} targets')
+
+def positive_int(payload: dict, name: str, default: int) -> int:
+    value = payload.get(name, default)
+    # bool is an int subclass, but true isn't a width
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise RequestError(400, f'{name} has to be a positive integer, got {value!r}')
+    return value
+
+def request_key(map_obj: Map, options: dict) -> tuple:
+    """
+    Requests with the same key get the same answer: the level fingerprint only covers the walls
+    and targets, so the starting positions and the options are part of the key too
+    """
+    return (map_obj.level.fingerprint, map_obj.state_key(), tuple(sorted(options.items())))
+
+def build_solver(map_obj: Map, options: dict) -> Solver:
+    heuristic = HEURISTICS[options['heuristic']]
+    if options['algorithm'] == 'adaptive':
+        # Pool workers don't start pools of their own
+        return AdaptiveBeamSearch(map_obj, heuristic, num_workers=1, allow_pulls=options['allow_pulls'])
+    if options['algorithm'] == 'lrta':
+        return LrtaStar(map_obj, heuristic, max_steps=options['max_steps'], allow_pulls=options['allow_pulls'])
+    return BeamSearch(map_obj, options['beam_width'], heuristic, allow_pulls=options['allow_pulls'])
+
+def solve_level(level: dict, options: dict) -> dict:
+    """
+    Runs in a pool worker: solves the level and returns the path as a move string and as state keys
+    """
+    map_obj = Map.from_dict(level)
+    solver = build_solver(map_obj, options)
+
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        path = solver.solve()
+
+    return {
+        'solved': bool(path) and path[-1].is_solved(),
+        'moves': moves_from_path(path) if path else '',
+        'path': [[list(player), [list(box) for box in boxes]]
+                 for player, boxes in (map_obj.state_key() for map_obj in path or [])],
+        'pull_moves': path[-1].undo_moves if path else 0,
+        'explored_states': solver.explored_states,
+        'solve_seconds': time.perf_counter() - start,
+    }
+
+
+class LatencyHistogram:
+    """
+    Per-bucket (non-cumulative) latency counts over LATENCY_BUCKETS, plus count and sum
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def stats(self) -> dict:
+        return {
+            'buckets': {('+inf' if bound == float('inf') else str(bound)): count
+                        for bound, count in zip(LATENCY_BUCKETS, self.counts)},
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+        }
+
+
+class SolutionCache:
+    """
+    LRU cache of finished solutions, keyed by request_key()
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SolveService:
+    """
+    Dispatches solves to a process pool, sharing one solve between concurrent identical
+    requests and caching the results
+    """
+
+    def __init__(self, workers: int | None = None, cache_size: int = 1024):
+        self.workers = workers or os.cpu_count()
+        # Forked workers would inherit the sockets of the connections open at the time, so a
+        # client could wait for a close that never comes: start them from a fork server instead
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('forkserver'))
+        # One slot per worker: solves past that wait here, which is what queue_depth reports
+        self.slots = asyncio.Semaphore(self.workers)
+        self.queued = 0
+        self.running = 0
+        self.cache = SolutionCache(cache_size)
+        # request key -> future of the solve currently running for it
+        self.in_flight = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.request_latency = LatencyHistogram()
+        self.solve_latency = LatencyHistogram()
+
+    async def solve(self, payload: dict) -> dict:
+        map_obj, options = parse_request(payload)
+        key = request_key(map_obj, options)
+
+        result = self.cache.get(key)
+        source = 'cache'
+        if result is None:
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                source = 'coalesced'
+            else:
+                future = self.in_flight[key] = asyncio.ensure_future(self.run_solve(key, map_obj, options))
+                source = 'solver'
+            # A cancelled client must not cancel the solve the other requests are waiting on
+            result = await asyncio.shield(future)
+
+        return dict(result, fingerprint=map_obj.level.fingerprint, source=source)
+
+    async def run_solve(self, key, map_obj: Map, options: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            self.queued += 1
+            try:
+                await self.slots.acquire()
+            finally:
+                self.queued -= 1
+
+            self.running += 1
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, solve_level, map_obj.to_dict(), options)
+            finally:
+                self.running -= 1
+                self.slots.release()
+
+            self.cache.put(key, result)
+            return result
+        finally:
+            self.solve_latency.observe(time.perf_counter() - start)
+            del self.in_flight[key]
+
+    def metrics(self) -> dict:
+        return {
+            'workers': self.workers,
+            'in_flight': len(self.in_flight),
+            'running': self.running,
+            # Solves waiting for a free worker
+            'queue_depth': self.queued,
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'cache': self.cache.stats(),
+            'request_latency': self.request_latency.stats(),
+            'solve_latency': self.solve_latency.stats(),
+        }
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/metrics':
+            return 200, self.metrics()
+        if path != '/solve':
+            raise RequestError(404, f'No route for {path}')
+        if method != 'POST':
+            raise RequestError(405, '/solve expects a POST')
+
+        # Every /solve request counts, including the ones that end in an error
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            try:
+                payload = json.loads(body or b'{}')
+            except json.JSONDecodeError as error:
+                raise RequestError(400, f'Invalid JSON: {error}')
+            if not isinstance(payload, dict):
+                raise RequestError(400, 'Expected a JSON object')
+
+            # Anything the solver raises past parse_request is a server error (500)
+            return 200, await self.solve(payload)
+        finally:
+            self.request_latency.observe(time.perf_counter() - start)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        One request per connection: read the request line, headers and body, answer and close
+        """
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            if len(request_line) < 2:
+                return
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            method, path = request_line[0].upper(), request_line[1].split('?')[0]
+            try:
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_SIZE:
+                    raise RequestError(413, f'Body larger than {MAX_BODY_SIZE} bytes')
+                body = await reader.readexactly(length) if length else b''
+                status, response = await self.route(method, path, body)
+            except RequestError as error:
+                self.errors += 1
+                status, response = error.status, {'error': str(error)}
+            except Exception as error:
+                self.errors += 1
+                status, response = 500, {'error': repr(error)}
+
+            data = json.dumps(response).encode()
+            writer.write(
+                f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n'
+                f'Connection: close\r\n\r\n'.encode('latin-1') + data
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self):
+        """
+        Starts every worker before the first connection is accepted
+        """
+        for future in [self.executor.submit(int) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765, unix_path: str | None = None,
+                workers: int | None = None, cache_size: int = 1024):
+    service = SolveService(workers, cache_size)
+    service.start()
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+        print(f"Serving on unix socket {unix_path} with {service.workers} workers")
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port} with {service.workers} workers")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help='serve on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
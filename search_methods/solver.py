@@ -1,10 +1,50 @@
+from .corrals import CorralPruner
+from .deadlock_db import DeadlockDatabase
+from .heuristic_cache import HeuristicCache
+from .packing import PackingPruner
+from .reachability import ReachabilityCache
+from .trace import TraceRecorder, CORRAL, PACKING
 from sokoban.map import Map
 
+from functools import partial
+import inspect
+
+
+def map_from_key(template: Map, state_key: tuple) -> Map:
+    """
+    Rebuilds a state from its (player_pos, box_positions) key, on the level of template.
+    Keys of a search with a pull budget also carry the pulls left, which the state gets back.
+    """
+    (player_x, player_y), box_positions = state_key[:2]
+    boxes = [(f'box{i}', x, y) for i, (x, y) in enumerate(box_positions)]
+    map_obj = Map.from_level(template.level, player_x, player_y, boxes)
+    if len(state_key) > 2:
+        map_obj.pull_budget = state_key[2]
+    return map_obj
+
 
 class Solver:
+    """
+    Base class of the solvers. The optional search features are switched on after construction,
+    once allow_pulls is set, through the enablers below: use_heuristic_cache, use_reachability,
+    use_deadlock_db, enable_corral_pruning, enable_packing_pruning, set_pull_budget, record_trace.
+    """
 
     def __init__(self, map: Map):
         self.map = map
+        self.allow_pulls = False
+        # Optional HeuristicCache for the box-only part of the heuristic, set by use_heuristic_cache
+        self.heuristic_cache: HeuristicCache | None = None
+        # Optional DeadlockDatabase, set by use_deadlock_db
+        self.deadlock_db: DeadlockDatabase | None = None
+        # Optional CorralPruner, set by enable_corral_pruning
+        self.corral_pruner = None
+        # Optional PackingPruner, set by enable_packing_pruning
+        self.packing_pruner = None
+        # Optional TraceRecorder, set by record_trace
+        self.trace: TraceRecorder | None = None
+        # Optional ReachabilityCache handed to the heuristic, set by use_reachability
+        self.reachability: ReachabilityCache | None = None
 
     def solve(self):
         raise NotImplementedError("solve() is only implemented in children")
@@ -12,9 +52,137 @@ class Solver:
     def get_hashable_state(self, map_obj: Map):
         """
         Generates a hashable representation of the current map state.
-        Essential for use in 'visited' sets. Includes player and sorted box positions.
+        Essential for use in 'visited' sets. Includes player and sorted box positions,
+        and the pulls left when the search runs with a pull budget.
         """
         player_pos = (map_obj.player.x, map_obj.player.y)
         # make it hashable then sort box positions to ensure the tuple maintains a consistent ordering
         box_positions = tuple(sorted(map_obj.positions_of_boxes.keys()))
-        return (player_pos, box_positions)
\ No newline at end of file
+        if map_obj.pull_budget is not None:
+            # The same position with more pulls left can still reach states the first visit couldn't
+            return (player_pos, box_positions, map_obj.pull_budget)
+        return (player_pos, box_positions)
+
+    def is_learned_deadlock(self, parent_boxes, neigh: Map) -> bool:
+        """
+        Checks a successor against the deadlock pattern database, learning new patterns on the way
+        """
+        return self.deadlock_db is not None and self.deadlock_db.check(parent_boxes, neigh)
+
+    def use_heuristic_cache(self, heuristic_cache: HeuristicCache):
+        """
+        Passes the cache to the heuristic, which reuses its box-only part across player positions.
+        The cache can be shared by several solvers, even on different levels.
+        """
+        self.heuristic_cache = heuristic_cache
+        self.heuristic = partial(self.heuristic, cache=heuristic_cache)
+
+    def use_reachability(self, reachability: ReachabilityCache):
+        """
+        Passes the cache to the heuristic, which has to take a reachability argument
+        (e.g. min_weight_bfs_with_player), so player regions are flooded once per box configuration
+        """
+        if 'reachability' not in inspect.signature(self.heuristic).parameters:
+            raise ValueError('The heuristic does not take a reachability cache')
+        self.reachability = reachability
+        self.heuristic = partial(self.heuristic, reachability=reachability)
+
+    def use_deadlock_db(self, deadlock_db: DeadlockDatabase):
+        """
+        Checks every successor against the pattern database, which learns new patterns on the way
+        """
+        # Learned deadlock patterns assume push-only search
+        if self.allow_pulls:
+            raise ValueError('A deadlock pattern database can only be used without pull moves')
+        self.deadlock_db = deadlock_db
+
+    def enable_corral_pruning(self):
+        # A pull can get the player into a corral, so PI-corrals only prune push-only search
+        if self.allow_pulls:
+            raise ValueError('Corral pruning can only be used without pull moves')
+        self.corral_pruner = CorralPruner()
+
+    def enable_packing_pruning(self):
+        """
+        Drops the moves that fill a target group out of its packing order (see packing.py).
+        Used by BeamSearch and LrtaStar.
+        """
+        self.packing_pruner = PackingPruner()
+
+    def set_pull_budget(self, pull_budget: int):
+        """
+        Lets the search make at most pull_budget pull moves along any path.
+        The budget lives in the states, so the search starts from a copy of the initial map,
+        and it is part of their hashable state, so visited sets and H_table tell budgets apart.
+        """
+        if not self.allow_pulls:
+            raise ValueError('A pull budget can only be used with pull moves')
+        if pull_budget < 0:
+            raise ValueError(f'pull_budget has to be at least 0, got {pull_budget}')
+        self.map = self.map.copy()
+        self.map.pull_budget = pull_budget
+
+    def track_heuristic_state(self):
+        """
+        Heuristics with a track_state hook (e.g. nearest_push) keep running totals on the states,
+        which every move then updates in O(1). Tracking starts on a copy of the initial map,
+        so the map given to the solver is left alone. Called at the start of solve().
+        """
+        heuristic = self.heuristic
+        while isinstance(heuristic, partial):
+            heuristic = heuristic.func
+        track_state = getattr(heuristic, 'track_state', None)
+        if track_state is not None and self.map.distance_table is None:
+            self.map = self.map.copy()
+            track_state(self.map)
+
+    def record_trace(self, trace: TraceRecorder):
+        """
+        Streams a record per generated successor to trace, see search_methods.trace
+        """
+        self.trace = trace
+
+    def prune_successors(self, current_map: Map, neighbours: list, depth: int = 0) -> list:
+        """
+        Drops the successors that push a box outside the fence of a PI-corral, if there is one,
+        and the ones that fill a target group out of order, for the pruners that are enabled.
+        depth is the one of the successors, for the trace.
+        """
+        for pruner, reason in ((self.corral_pruner, CORRAL), (self.packing_pruner, PACKING)):
+            if pruner is None:
+                continue
+
+            kept = pruner.filter(current_map, neighbours)
+            if self.trace is not None and len(kept) < len(neighbours):
+                current_key = self.get_hashable_state(current_map)
+                kept_ids = {id(neigh) for neigh in kept}
+                for neigh in neighbours:
+                    if id(neigh) not in kept_ids:
+                        self.trace.record(self.get_hashable_state(neigh), current_key, float('inf'), depth, reason)
+            neighbours = kept
+        return neighbours
+
+    def flush_trace(self):
+        if self.trace is not None:
+            self.trace.flush()
+
+    @property
+    def pruned_successors(self) -> int:
+        return sum(pruner.pruned for pruner in (self.corral_pruner, self.packing_pruner) if pruner is not None)
+
+    def map_from_hashable_state(self, state_key: tuple) -> Map:
+        return map_from_key(self.map, state_key)
+
+    def replay_hashable_path(self, path_keys: list, allow_pulls: bool) -> list:
+        """
+        Turns the keys of a path back into Map objects by replaying the moves from
+        the initial state, so counters such as undo_moves stay correct.
+        """
+        state_sequence = [self.map.copy()]
+        for state_key in path_keys[1:]:
+            state_sequence.append(next(
+                neigh for neigh in state_sequence[-1].get_neighbours(allow_pulls=allow_pulls)
+                if self.get_hashable_state(neigh) == state_key
+            ))
+
+        return state_sequence
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Search trace recording and reading.
+
+A TraceRecorder handed to a solver (Solver.record_trace) streams one record per generated successor:
+its state id, its parent's id, its heuristic value, its depth and why it was dropped, if it was.
+Records are buffered and written either as fixed-width binary records or as JSON lines.
+Solvers only touch the recorder behind an `is not None` check, so tracing costs nothing when off.
+
+Usage: python -m search_methods.trace RUN.trace [--tree STATE_ID]
+"""
+import argparse
+import json
+import math
+import struct
+
+# Why a successor was not kept. NONE means it was kept (expanded or chosen next)
+REASONS = ['none', 'goal', 'visited', 'deadlock', 'learned_deadlock', 'corral', 'not_selected', 'packing']
+NONE, GOAL, VISITED, DEADLOCK, LEARNED_DEADLOCK, CORRAL, NOT_SELECTED, PACKING = range(len(REASONS))
+
+MAGIC = b'SKTR\x01'
+# state id, parent id, heuristic, depth, reason
+RECORD = struct.Struct('<QQdIB')
+
+ID_MASK = (1 << 64) - 1
+# Multiplier of the Fibonacci hash that spreads the ids before sampling
+SAMPLING_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def state_id(state_key) -> int:
+    """
+    64-bit id of a (player_pos, box_positions) key. Hashes of int tuples don't depend on
+    the process, so ids agree between runs and workers. 0 stands for "no parent".
+    """
+    return hash(state_key) & ID_MASK
+
+
+class TraceRecorder:
+    """
+    Buffered writer of search traces.
+
+    sample_rate keeps that fraction of the states. The choice is made on the state id, so a
+    state is either always or never recorded, no matter how many times it is generated.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, buffer_size: int = 8192, binary: bool | None = None):
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f'sample_rate has to be in (0, 1], got {sample_rate}')
+        self.path = path
+        # Binary unless the file is named *.jsonl
+        self.binary = not path.endswith('.jsonl') if binary is None else binary
+        self.threshold = int(sample_rate * (1 << 64))
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.recorded = 0
+        self.sampled_out = 0
+
+        self.file = open(path, 'wb' if self.binary else 'w')
+        if self.binary:
+            self.file.write(MAGIC)
+
+    def record(self, state_key, parent_key, heuristic: float, depth: int, reason: int = NONE):
+        sid = state_id(state_key)
+        if self.threshold <= ID_MASK and (sid * SAMPLING_MULTIPLIER) & ID_MASK >= self.threshold:
+            self.sampled_out += 1
+            return
+
+        parent = 0 if parent_key is None else state_id(parent_key)
+        self.buffer.append((sid, parent, heuristic, depth, reason))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+
+        if self.binary:
+            self.file.write(b''.join(RECORD.pack(*record) for record in self.buffer))
+        else:
+            self.file.write(''.join(
+                json.dumps({'id': sid, 'parent': parent, 'h': None if math.isinf(h) else h,
+                            'depth': depth, 'reason': REASONS[reason]}) + '\n'
+                for sid, parent, h, depth, reason in self.buffer
+            ))
+        self.recorded += len(self.buffer)
+        self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> dict:
+        return {
+            'recorded': self.recorded + len(self.buffer),
+            'sampled_out': self.sampled_out,
+        }
+
+
+def read_trace(path: str):
+    """
+    Yields the records of a trace as (state_id, parent_id, heuristic, depth, reason_name)
+    """
+    with open(path, 'rb') as file:
+        head = file.read(len(MAGIC))
+        if head == MAGIC:
+            while True:
+                chunk = file.read(RECORD.size * 4096)
+                if not chunk:
+                    return
+                for sid, parent, h, depth, reason in RECORD.iter_unpack(chunk):
+                    yield sid, parent, h, depth, REASONS[reason]
+        else:
+            file.seek(0)
+            for line in file:
+                record = json.loads(line)
+                h = float('inf') if record['h'] is None else record['h']
+                yield record['id'], record['parent'], h, record['depth'], record['reason']
+
+
+class TraceTree:
+    """
+    The search tree of a trace: the first parent seen for every state, and its children.
+    A state recorded several times (e.g. kept as a candidate, then dropped as visited)
+    keeps the reason of every record, in order. Duplicates can be recorded before the state's
+    own record, so the parent of a 'visited' record gives way to the next other one.
+    Parents that were sampled out (or the root, id 0) make their children roots.
+    """
+
+    def __init__(self, records):
+        self.nodes = {} # state_id -> (parent_id, heuristic, depth, [reasons])
+        self.children = {}
+        for sid, parent, h, depth, reason in records:
+            node = self.nodes.get(sid)
+            if node is None:
+                self.nodes[sid] = (parent, h, depth, [reason])
+                self.children.setdefault(parent, []).append(sid)
+                continue
+
+            reasons = node[3]
+            if reason != 'visited' and all(previous == 'visited' for previous in reasons):
+                self.children[node[0]].remove(sid)
+                self.nodes[sid] = (parent, h, depth, reasons)
+                self.children.setdefault(parent, []).append(sid)
+            reasons.append(reason)
+
+    def roots(self) -> list:
+        return [sid for sid, (parent, *_) in self.nodes.items() if parent not in self.nodes]
+
+    def path_to(self, sid: int) -> list:
+        """
+        The ids from the oldest recorded ancestor down to sid
+        """
+        path = []
+        while sid in self.nodes and sid not in path:
+            path.append(sid)
+            sid = self.nodes[sid][0]
+        return list(reversed(path))
+
+    def subtree_size(self, sid: int) -> int:
+        size = 0
+        stack = [sid]
+        while stack:
+            node = stack.pop()
+            size += 1
+            stack.extend(self.children.get(node, []))
+        return size
+
+
+def depth_stats(records) -> dict:
+    """
+    Per depth: number of records, how many of them each reason covers, and the min / mean
+    of the finite heuristic values
+    """
+    stats = {}
+    for _, _, h, depth, reason in records:
+        entry = stats.setdefault(depth, {'count': 0, 'reasons': {}, 'h_min': math.inf, 'h_sum': 0.0, 'h_count': 0})
+        entry['count'] += 1
+        entry['reasons'][reason] = entry['reasons'].get(reason, 0) + 1
+        if not math.isinf(h):
+            entry['h_min'] = min(entry['h_min'], h)
+            entry['h_sum'] += h
+            entry['h_count'] += 1
+
+    for entry in stats.values():
+        entry['h_mean'] = entry['h_sum'] / entry['h_count'] if entry['h_count'] else math.inf
+        del entry['h_sum'], entry['h_count']
+
+    return dict(sorted(stats.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--tree', type=int, default=None, help='print the path from the root to this state id')
+    args = parser.parse_args()
+
+    records = list(read_trace(args.path))
+    print(f"{'depth':>5} {'records':>8} {'h min':>8} {'h mean':>8}  reasons")
+    for depth, entry in depth_stats(records).items():
+        reasons = ', '.join(f'{name}={count}' for name, count in sorted(entry['reasons'].items()))
+        print(f"{depth:>5} {entry['count']:>8} {entry['h_min']:>8.1f} {entry['h_mean']:>8.1f}  {reasons}")
+
+    if args.tree is not None:
+        tree = TraceTree(records)
+        for sid in tree.path_to(args.tree):
+            parent, h, depth, reasons = tree.nodes[sid]
+            print(f"{depth:>5} {sid:>20} h={h:<8} {' > '.join(reasons)} ({tree.subtree_size(sid)} below)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from .dummy import Dummy
 from .box import Box
 from .player import Player
+from .level import Level
 from .map import Map
 from .moves import (
     LEFT, 
@@ -14,4 +15,17 @@ from .moves import (
     moves_meaning
 )
 
-from .gif import save_images, create_gif
\ No newline at end of file
+# The GIF helpers pull in imageio and matplotlib, so they're only imported on first use.
+# Solver-only processes can import sokoban (or sokoban.map) without paying for them.
+_LAZY_ATTRIBUTES = {
+    'save_images': '.gif',
+    'create_gif': '.gif',
+    'create_figure': '.render',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        from importlib import import_module
+        return getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,126 @@
+from .map import Map
+
+from collections import deque
+import random
+
+
+__all__ = ['generate_level', 'generate_levels']
+
+DELTAS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+
+def generate_level(height, width, num_boxes, seed=None, wall_density=0.2, pulls_per_box=20, test_name=None):
+    '''
+    Generates a solvable level by reverse play.
+
+    Boxes start on random targets and the player pulls them away for num_boxes * pulls_per_box steps.
+    Every pull is a push played backwards, so the resulting level can always be solved.
+    Pulls that would leave a position Map.is_deadlock() rejects are skipped, so the solvers
+    don't prune the way back. The same seed always gives the same level.
+    '''
+    rng = random.Random(seed)
+    if test_name is None:
+        test_name = f'gen_{height}x{width}_{num_boxes}b_seed{seed}'
+
+    walls = generate_walls(rng, height, width, wall_density, num_boxes + 1)
+    floor = [(x, y) for x in range(height) for y in range(width) if (x, y) not in walls]
+
+    targets = rng.sample(floor, num_boxes)
+    target_set = set(targets)
+    boxes = set(targets)
+    player = rng.choice([cell for cell in floor if cell not in boxes])
+
+    # Only used to run the repo's own deadlock rules on the intermediate positions
+    probe = Map(height, width, 0, 0, [], targets, sorted(walls))
+
+    for _ in range(num_boxes * pulls_per_box):
+        region = flood(height, width, walls, boxes, player)
+        pulls = find_pulls(height, width, walls, boxes, region)
+        rng.shuffle(pulls)
+        # Boxes still sitting on targets get pulled first, so none of them stay trivially placed
+        pulls.sort(key=lambda pull: pull[0] not in target_set)
+
+        for box, player_pos, behind in pulls:
+            new_boxes = (boxes - {box}) | {player_pos}
+            probe.positions_of_boxes = dict.fromkeys(new_boxes, 'box')
+            if not probe.is_deadlock():
+                boxes = new_boxes
+                player = behind
+                break
+        else:
+            break
+
+    # Drop the player anywhere in its final region
+    player = rng.choice(sorted(flood(height, width, walls, boxes, player)))
+
+    box_list = [(f'box{i + 1}', x, y) for i, (x, y) in enumerate(sorted(boxes))]
+    return Map(height, width, player[0], player[1], box_list, targets, sorted(walls), test_name=test_name)
+
+def generate_levels(sizes, seed=0, **kwargs):
+    '''
+    Generates one level per (height, width, num_boxes) in sizes, with seeds derived from seed
+    '''
+    return [
+        generate_level(height, width, num_boxes, seed=seed + i, **kwargs)
+        for i, (height, width, num_boxes) in enumerate(sizes)
+    ]
+
+def in_bounds(height, width, x, y):
+    return 0 <= x < height and 0 <= y < width
+
+def flood(height, width, walls, boxes, start):
+    ''' Squares reachable from start without going through walls or boxes '''
+    region = {start}
+    queue = deque([start])
+
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in DELTAS:
+            nxt = (x + dx, y + dy)
+            if in_bounds(height, width, *nxt) and nxt not in walls and nxt not in boxes and nxt not in region:
+                region.add(nxt)
+                queue.append(nxt)
+
+    return region
+
+def find_pulls(height, width, walls, boxes, region):
+    '''
+    All pulls from the region as (box, player_pos, behind):
+    the player stands next to the box and steps back onto a free square, dragging the box along.
+    '''
+    pulls = []
+    for bx, by in sorted(boxes):
+        for dx, dy in DELTAS:
+            player_pos = (bx + dx, by + dy)
+            behind = (bx + 2 * dx, by + 2 * dy)
+            if player_pos not in region:
+                continue
+            if in_bounds(height, width, *behind) and behind not in walls and behind not in boxes:
+                pulls.append(((bx, by), player_pos, behind))
+
+    return pulls
+
+def generate_walls(rng, height, width, wall_density, min_floor):
+    '''
+    Scatters random walls and keeps only the biggest connected floor area,
+    so every floor square can be reached by the player.
+    '''
+    while True:
+        walls = {
+            (x, y) for x in range(height) for y in range(width)
+            if rng.random() < wall_density
+        }
+
+        best = set()
+        seen = set()
+        for x in range(height):
+            for y in range(width):
+                if (x, y) in walls or (x, y) in seen:
+                    continue
+                component = flood(height, width, walls, set(), (x, y))
+                seen |= component
+                if len(component) > len(best):
+                    best = component
+
+        if len(best) >= 2 * min_floor:
+            return {(x, y) for x in range(height) for y in range(width) if (x, y) not in best}
@@ -1,7 +1,6 @@
 from .map import Map
 
 from typing import List, Union
-import imageio
 import glob
 import os
 import re
@@ -24,6 +23,8 @@ def save_images(solution_steps: List[Union[str, Map]], save_path: str) -> None:
 
 
 def create_gif(path_images, gif_name, save_path):
+    import imageio
+
     images_paths = glob.glob(f'{path_images}/*.png')
 
     # Steps: extract filename -> remove .png -> remove non digit characters -> convert to int
@@ -0,0 +1,65 @@
+import hashlib
+
+
+__all__ = ['Level']
+
+
+class Level:
+    '''
+    Level Class records the static part of the board, shared by every state of a solve
+
+    Attributes:
+    length: length of the map
+    width: width of the map
+    obstacles: tuple of obstacle positions, in the order they were given
+    walls: frozenset of the obstacle positions, for O(1) checks
+    targets: tuple of target positions, in the order they were given
+    target_set: frozenset of the target positions, for O(1) checks
+    floor: frozenset of the in-bounds positions that aren't walls
+    test_name: name of the level
+    fingerprint: content hash of the size, walls and targets
+    '''
+    def __init__(self, length, width, obstacles, targets, test_name='test'):
+        set_attr = super().__setattr__
+        set_attr('length', length)
+        set_attr('width', width)
+        set_attr('obstacles', tuple((x, y) for x, y in obstacles))
+        set_attr('walls', frozenset(self.obstacles))
+        set_attr('targets', tuple((x, y) for x, y in targets))
+        set_attr('target_set', frozenset(self.targets))
+        set_attr('floor', frozenset(
+            (x, y) for x in range(length) for y in range(width) if (x, y) not in self.walls
+        ))
+        set_attr('test_name', test_name)
+        set_attr('fingerprint', self.compute_fingerprint())
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Level objects are immutable')
+
+    def compute_fingerprint(self):
+        '''
+        Content hash of the size, walls and targets, used to key the per-level analysis tables.
+        Targets keep their order, since those tables are indexed by target.
+        '''
+        digest = hashlib.sha256()
+        digest.update(f'{self.length}x{self.width}'.encode())
+        digest.update(repr(sorted(self.walls)).encode())
+        digest.update(repr(self.targets).encode())
+        return digest.hexdigest()[:32]
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.length and 0 <= y < self.width
+
+    def is_wall(self, x, y):
+        ''' Checks if a given position is an obstacle or falls outside the map bounds '''
+        return not (0 <= x < self.length and 0 <= y < self.width) or (x, y) in self.walls
+
+    def __eq__(self, other):
+        return isinstance(other, Level) and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __str__(self):
+        ''' Overriding toString method for Level class'''
+        return f'Level {self.test_name}: {self.length}x{self.width}, {len(self.walls)} walls, {len(self.targets)} targets'
@@ -1,10 +1,9 @@
 from .player import Player
 from .box import Box
+from .level import Level
 from .moves import *
 
-from matplotlib import pyplot as plt
 from typing import Optional
-import yaml
 import os
 
 
@@ -16,30 +15,36 @@ class Map:
     '''
     Map Class records the state of the board
     where the player is, what moves can the player make, where are the boxes and where they have to go, and the obstacles.
+    The walls and targets live in an immutable Level, shared by the map and all of its copies.
 
     Attributes:
-    length: length of the map
-    width: width of the map
+    level: Level object holding the size, the obstacles and the targets
     player: player object, positioned on the map
     boxes: list of box objects, positioned on the map
-    obstacles: list of obstacles given as tuples for positions on the map
-    targets: list of target objects, positioned on the map
-    map: 2D matrix representing the map
     explored_states: number of explored states
     undo_moves: number of undo moves made // e.g. _ P B => P B _
+    pull_budget: number of undo moves the state may still make, None for no limit
+    boxes_on_targets: number of boxes sitting on a target, kept up to date by every move
+    moved_box: name of the box moved by the last move, None if it only moved the player
+    distance_table: optional per-square box distances (see track_distances), shared by the copies
+    box_distances: distance_table value of every box, distance_sum: their sum
     '''
     def __init__(self, length, width, player_x, player_y, boxes, targets, obstacles, test_name='test'):
-        self.length = length
-        self.width = width
-        self.map = [[0 for _ in range(width)] for _ in range(length)]
-        self.obstacles = obstacles
-        self.test_name = test_name
+        self.level = Level(length, width, obstacles, targets, test_name)
+        self.init_state(player_x, player_y, boxes)
 
+    @classmethod
+    def from_level(cls, level, player_x, player_y, boxes):
+        ''' Builds a state on an existing level, without copying its walls and targets '''
+        new_map = cls.__new__(cls)
+        new_map.level = level
+        new_map.init_state(player_x, player_y, boxes)
+        return new_map
+
+    def init_state(self, player_x, player_y, boxes):
         self.explored_states = 0
         self.undo_moves = 0
-
-        for obstacle_x, obstacle_y in self.obstacles:
-            self.map[obstacle_x][obstacle_y] = OBSTACLE_SYMBOL
+        self.pull_budget = None
 
         self.player = Player('player', 'P', player_x, player_y)
 
@@ -53,12 +58,56 @@ class Map:
 
             self.positions_of_boxes[(box_x, box_y)] = box_name
 
-            self.map[box_x][box_y] = BOX_SYMBOL
+        self.boxes_on_targets = sum(position in self.level.target_set for position in self.positions_of_boxes)
+        self.moved_box = None
+        self.distance_table = None
+        self.box_distances = None
+        self.distance_sum = 0
 
-        self.targets = []
-        for target_x, target_y in targets:
-            self.targets.append((target_x, target_y))
-            self.map[target_x][target_y] = TARGET_SYMBOL
+    @property
+    def unplaced_boxes(self):
+        return len(self.boxes) - self.boxes_on_targets
+
+    def track_distances(self, distance_table):
+        '''
+        Keeps box_distances and distance_sum up to date from now on, for this state and its copies.
+        distance_table[x][y] is the distance of a box on (x, y), e.g. to its nearest target.
+        '''
+        self.distance_table = distance_table
+        self.box_distances = {name: distance_table[box.x][box.y] for name, box in self.boxes.items()}
+        self.distance_sum = sum(self.box_distances.values())
+
+    @property
+    def length(self):
+        return self.level.length
+
+    @property
+    def width(self):
+        return self.level.width
+
+    @property
+    def obstacles(self):
+        return self.level.obstacles
+
+    @property
+    def targets(self):
+        return self.level.targets
+
+    @property
+    def test_name(self):
+        return self.level.test_name
+
+    @property
+    def map(self):
+        ''' 2D matrix representing the map, built on demand (boxes hide the targets below them) '''
+        grid = [[0 for _ in range(self.width)] for _ in range(self.length)]
+        for obstacle_x, obstacle_y in self.level.obstacles:
+            grid[obstacle_x][obstacle_y] = OBSTACLE_SYMBOL
+        for target_x, target_y in self.level.targets:
+            grid[target_x][target_y] = TARGET_SYMBOL
+        for box_x, box_y in self.positions_of_boxes:
+            grid[box_x][box_y] = BOX_SYMBOL
+        return grid
 
     @classmethod
     def from_str(cls, state_str):
@@ -92,9 +141,16 @@ class Map:
 
     @classmethod
     def from_yaml(cls, path):
+        import yaml
+
         with open(path, 'r') as file:
             data = yaml.load(file, Loader=yaml.FullLoader)
 
+        return cls.from_dict(data, test_name=path.split('/')[-1].split('.')[0])
+
+    @classmethod
+    def from_dict(cls, data, test_name='test'):
+        ''' Builds a map from the fields of the yaml files (height, width, player, boxes, targets, walls) '''
         return cls(
             length=data['height'], 
             width=data['width'], 
@@ -103,28 +159,31 @@ class Map:
             boxes=data['boxes'], 
             targets=data['targets'], 
             obstacles=data['walls'], 
-            test_name=path.split('/')[-1].split('.')[0]
+            test_name=test_name
         )
-    def is_box(self, row, col):
-        ''' Checks if a given position is a box '''
-        if row < 0 or row >= self.length or col < 0 or col >= self.width:
-            return False
 
-        if self.map[row][col] == BOX_SYMBOL:
-            return True
+    def to_dict(self):
+        ''' The fields written by save_to_yaml, as plain lists '''
+        return {
+            'height': self.length,
+            'width': self.width,
+            'player': [self.player.x, self.player.y],
+            'boxes': [[box.name, box.x, box.y] for box in self.boxes.values()],
+            'targets': [list(target) for target in self.targets],
+            'walls': [list(obstacle) for obstacle in self.obstacles],
+        }
 
-        return False
+    def is_box(self, row, col):
+        ''' Checks if a given position is a box '''
+        return (row, col) in self.positions_of_boxes
 
     def is_wall(self, x, y):
         ''' Checks if a given position is a wall or falls outside the map bounds '''
-        if x < 0 or x >= self.length or y < 0 or y >= self.width:
+        if self.level.is_wall(x, y):
             return True
 
-        if self.map[x][y] == OBSTACLE_SYMBOL:
-            return True
-        
         # box on a target is considered a wall
-        if (x, y) in self.positions_of_boxes and (x, y) in self.targets:
+        if (x, y) in self.positions_of_boxes and (x, y) in self.level.target_set:
             return True
         
         return False
@@ -137,7 +196,7 @@ class Map:
         '''
         # Check if there are any boxes that can no longer be moved
         for box_pos in self.positions_of_boxes.keys():
-            if box_pos in self.targets:
+            if box_pos in self.level.target_set:
                 continue
             x, y = box_pos
             up = self.is_wall(x, y + 1)
@@ -215,10 +274,10 @@ class Map:
         # if x < 0 or x >= self.length or y < 0 or y >= self.width:
         #     return False
 
-        if self.map[x][y] == OBSTACLE_SYMBOL:
+        if (x, y) in self.level.walls:
             return False
 
-        if self.map[x][y] == BOX_SYMBOL:
+        if (x, y) in self.positions_of_boxes:
             return False
 
         return True
@@ -231,7 +290,7 @@ class Map:
 
         future_position = self.player.get_future_position(move)
 
-        if self.map[future_position[0]][future_position[1]] == OBSTACLE_SYMBOL:
+        if future_position in self.level.walls:
             return False
 
         if future_position in self.positions_of_boxes:
@@ -264,13 +323,12 @@ class Map:
             # Case in which the box is in the opposite position of the player for the move
 
             straight_move_flag = False
-            if self.map[future_position[0]][future_position[1]] == BOX_SYMBOL:
+            if future_position in self.positions_of_boxes:
                 straight_move_flag = self.object_valid_move(self.boxes[self.positions_of_boxes[future_position]], implicit_move)
 
             opposite_position = self.player.get_opposite_position(implicit_move)
-            if 0 <= opposite_position[0] < self.length and 0 <= opposite_position[1] < self.width:
-                if self.map[opposite_position[0]][opposite_position[1]] == BOX_SYMBOL:
-                    straight_move_flag = (straight_move_flag or self.object_valid_move(self.boxes[self.positions_of_boxes[opposite_position]], implicit_move))
+            if opposite_position in self.positions_of_boxes:
+                straight_move_flag = (straight_move_flag or self.object_valid_move(self.boxes[self.positions_of_boxes[opposite_position]], implicit_move))
 
             return straight_move_flag
 
@@ -288,22 +346,34 @@ class Map:
         else:
             raise ValueError('is_valid_move outside range error')
 
+    def move_box(self, box, move):
+        ''' Moves the box one square, updating the counters of the state in O(1)'''
+        old_position = (box.x, box.y)
+        # Update the position of the box in the dictionary
+        del self.positions_of_boxes[old_position]
+
+        box.make_move(move)
+        new_position = (box.x, box.y)
+        self.positions_of_boxes[new_position] = box.name
+
+        target_set = self.level.target_set
+        self.boxes_on_targets += (new_position in target_set) - (old_position in target_set)
+        self.moved_box = box.name
+
+        if self.distance_table is not None:
+            distance = self.distance_table[box.x][box.y]
+            self.distance_sum += distance - self.box_distances[box.name]
+            self.box_distances[box.name] = distance
+
     def apply_move(self, move):
         ''' Applies the move to the map'''
+        self.moved_box = None
 
         if move < BOX_LEFT:
             if self.player_valid_move(move):
                 future_position = self.player.get_future_position(move)
-                if self.map[future_position[0]][future_position[1]] == BOX_SYMBOL:
-                    box = self.boxes[self.positions_of_boxes[future_position]]
-
-                    # Update the position of the box in the dictionary
-                    del self.positions_of_boxes[(box.x, box.y)]
-                    self.map[box.x][box.y] = 0
-
-                    box.make_move(move)
-                    self.map[box.x][box.y] = BOX_SYMBOL
-                    self.positions_of_boxes[(box.x, box.y)] = box.name
+                if future_position in self.positions_of_boxes:
+                    self.move_box(self.boxes[self.positions_of_boxes[future_position]], move)
 
                 self.player.make_move(move)
             else:
@@ -325,15 +395,10 @@ class Map:
 
                     box = self.boxes[self.positions_of_boxes[opposite_position]]
                     self.undo_moves += 1
+                    if self.pull_budget is not None:
+                        self.pull_budget -= 1
 
-                # Update the position of the box in the dictionary
-                del self.positions_of_boxes[(box.x, box.y)]
-                self.map[box.x][box.y] = 0
-
-                box.make_move(implicit_move)
-                self.map[box.x][box.y] = BOX_SYMBOL
-                self.positions_of_boxes[(box.x, box.y)] = box.name
-
+                self.move_box(box, implicit_move)
                 self.player.make_move(implicit_move)
             else:
                 raise ValueError('Apply Error: Got to make an invalid move')
@@ -342,18 +407,9 @@ class Map:
 
         self.explored_states += 1
 
-        # Regenerate the targets on the map, if the box moved off them
-        for target_x, target_y in self.targets:
-            if (target_x, target_y) not in self.positions_of_boxes:
-                self.map[target_x][target_y] = TARGET_SYMBOL
-
     def is_solved(self):
-        ''' Checks if all the boxes are on the targets'''
-        for target_x, target_y in self.targets:
-            if not (target_x, target_y) in self.positions_of_boxes:
-                return False
-
-        return True
+        ''' Checks if all the targets are covered, each box can cover only one'''
+        return self.boxes_on_targets == len(self.level.target_set)
 
     def filter_possible_moves(self):
         ''' Returns the possible moves the player can make'''
@@ -365,22 +421,44 @@ class Map:
 
     def copy(self):
         ''' Returns a copy of the current state'''
-        new_map = Map(self.length, self.width, self.player.x, self.player.y, [(box.name, box.x, box.y) for box in self.boxes.values()], self.targets, self.obstacles)
-        new_map.map = [row.copy() for row in self.map]
+        # The level is shared, only the player and the boxes are copied
+        new_map = Map.__new__(Map)
+        new_map.level = self.level
+        new_map.player = Player('player', 'P', self.player.x, self.player.y)
+        new_map.boxes = {name: Box(name, 'B', box.x, box.y) for name, box in self.boxes.items()}
         new_map.positions_of_boxes = self.positions_of_boxes.copy()
         new_map.explored_states = self.explored_states
         new_map.undo_moves = self.undo_moves
+        new_map.pull_budget = self.pull_budget
+        new_map.boxes_on_targets = self.boxes_on_targets
+        new_map.moved_box = self.moved_box
+        new_map.distance_table = self.distance_table
+        new_map.box_distances = None if self.box_distances is None else self.box_distances.copy()
+        new_map.distance_sum = self.distance_sum
         return new_map
 
+    def is_pull_move(self, move):
+        ''' Box moves drag the box behind the player when there is no box ahead to push '''
+        if move < BOX_LEFT:
+            return False
+        return self.player.get_future_position(move - 4) not in self.positions_of_boxes
+
+    def can_pull(self, allow_pulls = True):
+        ''' Checks if the state may make one more undo move '''
+        return allow_pulls and (self.pull_budget is None or self.pull_budget > 0)
+
     def get_neighbours(self, allow_pulls = True):
-        ''' Returns the neighbours of the current state'''
+        '''
+        Returns the neighbours of the current state
+        Pull moves are skipped before copying the state when they are not allowed or the pull budget is spent
+        '''
         neighbours = []
-        moves = []
+        can_pull = self.can_pull(allow_pulls)
         for move in self.filter_possible_moves():
+            if not can_pull and self.is_pull_move(move):
+                continue
             new_map = self.copy()
             new_map.apply_move(move)
-            if not allow_pulls and new_map.undo_moves > 0:
-                continue
             neighbours.append(new_map)
         return neighbours
 
@@ -396,6 +474,7 @@ class Map:
 
     def save_to_yaml(self, path):
         ''' Saves the map to a yaml file'''
+        import yaml
 
         path = self.check_existing_folder(path)
 
@@ -404,8 +483,8 @@ class Map:
         data['width'] = self.width
         data['player'] = [self.player.x, self.player.y]
         data['boxes'] = [(box.name, box.x, box.y) for box in self.boxes.values()]
-        data['targets'] = self.targets
-        data['walls'] = self.obstacles
+        data['targets'] = list(self.targets)
+        data['walls'] = [list(obstacle) for obstacle in self.obstacles]
 
         with open(path, 'w') as file:
             yaml.dump(data, file)
@@ -419,43 +498,9 @@ class Map:
         save_path: Optional[str] = None, 
         save_name: Optional[str] = None
     ) -> None:
-        fig, ax = plt.subplots()
-        ax.imshow(self.map, cmap='viridis')
-
-        marker_size = 10
-        ax.invert_yaxis()
-
-        width_labels = [x - 0.5 for x in range(self.width)]
-        length_labels = [y - 0.5 for y in range(self.length)]
-
-        ax.grid(True, which='major', color='black', linewidth=1.5)
-        ax.set_xticks(width_labels)
-        ax.set_yticks(length_labels)
-        ax.xaxis.set_ticks_position('none')
-        ax.yaxis.set_ticks_position('none')
-        ax.xaxis.set_ticklabels([])
-        ax.yaxis.set_ticklabels([])
-
-        ax.plot(self.player.y, self.player.x, 'ro', markersize=1.5 * marker_size)
-
-        for box in self.boxes.values():
-            ax.plot(box.y, box.x, 'bs', markersize=marker_size)
-
-        for target_x, target_y in self.targets:
-            ax.plot(target_y, target_x, 'gx', markersize=marker_size)
-
-        if save_path:
-            os.makedirs(save_path, exist_ok=True)
-            if save_name is None:
-                save_name = 'default.png'
-            if not save_name.endswith('.png'):
-                save_name += '.png'
-            fig.savefig(os.path.join(save_path, save_name))
-
-        if show:
-            plt.show()
-
-        plt.close(fig)
+        # matplotlib is only loaded when something actually gets drawn
+        from .render import create_figure
+        create_figure(self, show=show, save_path=save_path, save_name=save_name)
 
     def plot_map(self, save_path: Optional[str] = None, save_name: Optional[str] = None):
         self._create_figure(show=True, save_path=save_path, save_name=save_name)
@@ -464,20 +509,27 @@ class Map:
         self._create_figure(show=False, save_path=save_path, save_name=save_name)
 
     def __lt__(self, other):
-        return str(self) < str(other)
+        # Only used to break ties in heaps, so compare the player and box positions
+        # instead of building the whole text grid of both maps
+        return self.state_key() < other.state_key()
+
+    def state_key(self):
+        ''' Returns the player position and the sorted box positions as a tuple '''
+        return ((self.player.x, self.player.y), tuple(sorted(self.positions_of_boxes.keys())))
 
     def __str__(self):
         ''' Overriding toString method for Map class'''
+        grid = self.map
         name = ''
         for i in range(self.length):
             for j in range(self.width):
                 if self.player.x == i and self.player.y == j:
                     name += f"{self.player.get_symbol()} "
-                elif self.map[i][j] == 1:
+                elif grid[i][j] == 1:
                     name += f"/ "
-                elif self.map[i][j] == 2:
+                elif grid[i][j] == 2:
                     name += f"B "
-                elif self.map[i][j] == 3:
+                elif grid[i][j] == 3:
                     name += f"X "
                 else:
                     name += f"_ "
@@ -0,0 +1,51 @@
+from matplotlib import pyplot as plt
+from typing import Optional
+import os
+
+__all__ = ['create_figure']
+
+
+def create_figure(
+    map_obj, 
+    show: bool = True, 
+    save_path: Optional[str] = None, 
+    save_name: Optional[str] = None
+) -> None:
+    ''' Draws the map with matplotlib, then shows it and/or saves it as a png '''
+    fig, ax = plt.subplots()
+    ax.imshow(map_obj.map, cmap='viridis')
+
+    marker_size = 10
+    ax.invert_yaxis()
+
+    width_labels = [x - 0.5 for x in range(map_obj.width)]
+    length_labels = [y - 0.5 for y in range(map_obj.length)]
+
+    ax.grid(True, which='major', color='black', linewidth=1.5)
+    ax.set_xticks(width_labels)
+    ax.set_yticks(length_labels)
+    ax.xaxis.set_ticks_position('none')
+    ax.yaxis.set_ticks_position('none')
+    ax.xaxis.set_ticklabels([])
+    ax.yaxis.set_ticklabels([])
+
+    ax.plot(map_obj.player.y, map_obj.player.x, 'ro', markersize=1.5 * marker_size)
+
+    for box in map_obj.boxes.values():
+        ax.plot(box.y, box.x, 'bs', markersize=marker_size)
+
+    for target_x, target_y in map_obj.targets:
+        ax.plot(target_y, target_x, 'gx', markersize=marker_size)
+
+    if save_path:
+        os.makedirs(save_path, exist_ok=True)
+        if save_name is None:
+            save_name = 'default.png'
+        if not save_name.endswith('.png'):
+            save_name += '.png'
+        fig.savefig(os.path.join(save_path, save_name))
+
+    if show:
+        plt.show()
+
+    plt.close(fig)
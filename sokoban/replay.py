@@ -0,0 +1,219 @@
+from .level import Level
+from .map import Map
+from .moves import *
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import os
+
+
+__all__ = ['ReplayEngine', 'engine_for', 'moves_from_path', 'map_moves', 'replay', 'replay_batch']
+
+# Direction letters, following the coordinates of Dummy.get_future_position
+DIRECTIONS = {'l': LEFT, 'r': RIGHT, 'u': UP, 'd': DOWN}
+LETTERS = {move: letter for letter, move in DIRECTIONS.items()}
+DELTAS = {LEFT: (0, -1), RIGHT: (0, 1), DOWN: (-1, 0), UP: (1, 0)}
+
+# Lowercase letters walk, uppercase letters push, and a '-' before an uppercase letter pulls:
+# the player steps in that direction, dragging the box that was behind them
+PULL_PREFIX = '-'
+
+# Per-process memo of the last levels seen, so a batch of solutions for the same level
+# parses its yaml and builds its engine once per worker, without growing in long-lived workers
+MEMO_LEVELS = 64
+
+
+class ReplayEngine:
+    '''
+    ReplayEngine Class checks move strings against a level without building Map objects
+
+    The board is padded with a ring of walls and flattened, so the player is a single index,
+    the boxes are a bytearray and every step is a couple of lookups with no bounds checks.
+    The number of boxes on targets is kept up to date, so the solved check is O(1).
+
+    Attributes:
+    level: Level being replayed
+    stride: length of a row of the padded board
+    walls: bytearray, 1 for the walls and the padding
+    targets: bytearray, 1 for the targets
+    '''
+    def __init__(self, level: Level):
+        self.level = level
+        self.stride = level.width + 2
+        size = (level.length + 2) * self.stride
+
+        self.walls = bytearray(b'\x01' * size)
+        for x, y in level.floor:
+            self.walls[self.index(x, y)] = 0
+
+        self.targets = bytearray(size)
+        for x, y in level.targets:
+            self.targets[self.index(x, y)] = 1
+
+        self.offsets = {move: dx * self.stride + dy for move, (dx, dy) in DELTAS.items()}
+
+    def index(self, x, y):
+        return (x + 1) * self.stride + (y + 1)
+
+    def position(self, index):
+        return (index // self.stride - 1, index % self.stride - 1)
+
+    def replay(self, player_pos, box_positions, moves: str) -> dict:
+        '''
+        Replays moves from the given player and box positions.
+        Stops at the first illegal move, reporting its offset in the string.
+        '''
+        walls = self.walls
+        targets = self.targets
+        boxes = bytearray(len(walls))
+        on_target = 0
+        for x, y in box_positions:
+            boxes[self.index(x, y)] = 1
+            on_target += targets[self.index(x, y)]
+
+        player = self.index(*player_pos)
+        steps = pushes = pulls = 0
+        error = None
+        pull = False
+
+        for offset, letter in enumerate(moves):
+            if letter == PULL_PREFIX:
+                if pull:
+                    error = 'repeated pull prefix'
+                    break
+                pull = True
+                continue
+
+            move = DIRECTIONS.get(letter.lower())
+            if move is None:
+                error = f'unknown move {letter!r}'
+                break
+            if pull and letter.islower():
+                error = 'a pull has to be written in uppercase'
+                break
+
+            delta = self.offsets[move]
+            ahead = player + delta
+
+            if walls[ahead] or boxes[ahead]:
+                if letter.islower() or pull or walls[ahead]:
+                    error = f'{"blocked" if walls[ahead] else "box in the way"} on {letter!r}'
+                    break
+
+                # Push: the box ahead moves one square further
+                behind_box = ahead + delta
+                if walls[behind_box] or boxes[behind_box]:
+                    error = f'box can\'t be pushed on {letter!r}'
+                    break
+                boxes[ahead] = 0
+                boxes[behind_box] = 1
+                on_target += targets[behind_box] - targets[ahead]
+                pushes += 1
+            elif pull:
+                # Pull: the box behind the player follows onto the square they leave
+                behind = player - delta
+                if not boxes[behind]:
+                    error = f'no box to pull on {letter!r}'
+                    break
+                boxes[behind] = 0
+                boxes[player] = 1
+                on_target += targets[player] - targets[behind]
+                pulls += 1
+            elif letter.isupper():
+                error = f'no box to push on {letter!r}'
+                break
+
+            player = ahead
+            steps += 1
+            pull = False
+
+        else:
+            if pull:
+                offset = len(moves)
+                error = 'pull prefix without a move'
+
+        return {
+            'valid': error is None,
+            'error': error,
+            'error_offset': offset if error is not None else None,
+            'steps': steps,
+            'pushes': pushes,
+            'pulls': pulls,
+            'boxes_on_targets': on_target,
+            'solved': on_target == len(self.level.target_set),
+            'player': self.position(player),
+            'boxes': sorted(self.position(i) for i, box in enumerate(boxes) if box),
+        }
+
+    def replay_map(self, map_obj: Map, moves: str) -> dict:
+        return self.replay((map_obj.player.x, map_obj.player.y), map_obj.positions_of_boxes, moves)
+
+
+def moves_from_path(path: list) -> str:
+    '''
+    Writes the move string of a solver path (a list of consecutive Map states)
+    '''
+    letters = []
+    for previous, current in zip(path, path[1:]):
+        delta = (current.player.x - previous.player.x, current.player.y - previous.player.y)
+        move = next((move for move, move_delta in DELTAS.items() if move_delta == delta), None)
+        if move is None:
+            raise ValueError(f'States are not consecutive: player moved by {delta}')
+
+        letter = LETTERS[move]
+        old_boxes = previous.positions_of_boxes.keys() - current.positions_of_boxes.keys()
+        if not old_boxes:
+            letters.append(letter)
+        elif old_boxes == {(current.player.x, current.player.y)}:
+            letters.append(letter.upper())
+        else:
+            letters.append(PULL_PREFIX + letter.upper())
+
+    return ''.join(letters)
+
+def map_moves(moves: str) -> list:
+    '''
+    The Map.apply_move codes of a move string: walks stay walks, pushes and pulls become box moves
+    '''
+    codes = []
+    for letter in moves:
+        # Map tells pushes and pulls apart by where the box is
+        if letter == PULL_PREFIX:
+            continue
+        move = DIRECTIONS[letter.lower()]
+        codes.append(move + 4 if letter.isupper() else move)
+    return codes
+
+def replay(level, moves: str) -> dict:
+    '''
+    Replays moves on a level given as a Map, a yaml path or the fields of a yaml file
+    '''
+    if isinstance(level, str):
+        level = load_level(level)
+    elif isinstance(level, dict):
+        level = Map.from_dict(level)
+    return engine_for(level.level).replay_map(level, moves)
+
+@lru_cache(maxsize=MEMO_LEVELS)
+def load_level(path: str) -> Map:
+    return Map.from_yaml(path)
+
+@lru_cache(maxsize=MEMO_LEVELS)
+def engine_for(level: Level) -> ReplayEngine:
+    # Levels hash and compare by fingerprint
+    return ReplayEngine(level)
+
+def replay_job(job: tuple) -> dict:
+    return replay(*job)
+
+def replay_batch(jobs: list, workers: int | None = None, chunksize: int = 64) -> list:
+    '''
+    Replays (level, moves) pairs over a pool of worker processes, keeping the order of jobs.
+    Levels are best given as yaml paths or dicts, which are cheaper to send than Map objects.
+    '''
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(jobs) <= chunksize:
+        return [replay_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(replay_job, jobs, chunksize=chunksize))
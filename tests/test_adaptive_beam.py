@@ -0,0 +1,61 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.replay import moves_from_path, replay
+from search_methods.adaptive_beam import AdaptiveBeamSearch
+from search_methods.heuristics import min_weight_bfs
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_map(name):
+    return Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'initial_width': 0},
+    {'growth': 1},
+    {'initial_width': 8, 'max_width': 4},
+    {'restarts': 0},
+])
+def test_bad_schedules_are_refused(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveBeamSearch(load_map('easy_map1'), min_weight_bfs, num_workers=1, **kwargs)
+
+
+def test_widths_grow_up_to_the_maximum():
+    solver = AdaptiveBeamSearch(load_map('easy_map1'), min_weight_bfs, initial_width=3, growth=3,
+                                max_width=30, restarts=2, num_workers=1, seed=10)
+
+    assert solver.widths() == [3, 9, 27]
+    # The first run of every width keeps the plain order, the restarts get their own seed
+    assert [(args[5], args[6]) for args in solver.schedule()] == [
+        (3, None), (3, 11), (9, None), (9, 13), (27, None), (27, 15)]
+
+
+@pytest.mark.parametrize('num_workers', [1, 2])
+def test_attempts_stop_at_the_first_solution(num_workers):
+    map_obj = load_map('medium_map1')
+    solver = AdaptiveBeamSearch(map_obj, min_weight_bfs, restarts=2, num_workers=num_workers)
+    path = solver.solve()
+
+    assert replay(map_obj, moves_from_path(path))['solved']
+    assert [attempt['solved'] for attempt in solver.attempts].count(True) == 1
+    assert solver.attempts[-1]['solved']
+    assert solver.explored_states == sum(attempt['explored_states'] for attempt in solver.attempts)
+
+
+def test_unsolved_schedule_returns_the_best_attempt():
+    map_obj = load_map('hard_map1')
+    solver = AdaptiveBeamSearch(map_obj, min_weight_bfs, initial_width=1, max_width=2,
+                                restarts=1, patience=3, num_workers=1)
+    path = solver.solve()
+
+    assert not replay(map_obj, moves_from_path(path))['solved']
+    assert len(solver.attempts) == 2
+    assert min_weight_bfs(path[-1]) == min(attempt['heuristic'] for attempt in solver.attempts)
@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.replay import moves_from_path, replay
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import min_weight_bfs
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_map(name):
+    return Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+
+
+def assert_walks_to(map_obj, path):
+    ''' path starts on map_obj and its moves replay onto its last state '''
+    assert path[0].state_key() == map_obj.state_key()
+    result = replay(map_obj, moves_from_path(path))
+    assert result['valid']
+    assert result['player'] == (path[-1].player.x, path[-1].player.y)
+    assert result['boxes'] == sorted(path[-1].positions_of_boxes)
+    return result
+
+
+@pytest.mark.parametrize('name', ['easy_map1', 'medium_map1', 'hard_map2'])
+def test_solutions_replay(name):
+    map_obj = load_map(name)
+    solver = BeamSearch(map_obj, 20, min_weight_bfs)
+    path = solver.solve()
+
+    assert assert_walks_to(map_obj, path)['solved']
+    assert solver.explored_states > 0
+
+
+def test_unsolved_search_returns_the_path_to_its_best_state():
+    # A beam this narrow runs dry on hard_map1
+    map_obj = load_map('hard_map1')
+    solver = BeamSearch(map_obj, 2, min_weight_bfs)
+    path = solver.solve()
+
+    assert not assert_walks_to(map_obj, path)['solved']
+    assert len(path) > 1
+    assert min_weight_bfs(path[-1]) == min(min_weight_bfs(state) for state in path)
+    assert solver.explored_states == 0
+
+
+def test_patience_stops_a_stagnating_search():
+    map_obj = load_map('hard_map1')
+    unbounded = BeamSearch(map_obj, 2, min_weight_bfs)
+    unbounded.solve()
+    impatient = BeamSearch(map_obj, 2, min_weight_bfs, patience=3)
+    path = impatient.solve()
+
+    assert not assert_walks_to(map_obj, path)['solved']
+    assert 0 < impatient.visited_states < unbounded.visited_states
+
+
+def test_seeded_ties_are_reproducible():
+    map_obj = load_map('medium_map1')
+    first = BeamSearch(map_obj, 5, min_weight_bfs, seed=1).solve()
+    second = BeamSearch(map_obj, 5, min_weight_bfs, seed=1).solve()
+
+    assert [state.state_key() for state in first] == [state.state_key() for state in second]
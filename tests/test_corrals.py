@@ -0,0 +1,77 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.replay import moves_from_path, replay
+from search_methods.beam_search import BeamSearch
+from search_methods.corrals import CorralPruner, find_pi_corral
+from search_methods.heuristics import min_weight_bfs
+from search_methods.lrta_star import LrtaStar
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The column of boxes fences off the targets on the right, which only a push to the right can reach
+FENCED = '''
+/ / / / / / / /
+/ _ _ _ B _ X /
+/ P B _ B _ X /
+/ _ _ X B _ X /
+/ / / / / / / /
+'''
+FENCE = {(1, 4), (2, 4), (3, 4)}
+
+
+def test_fence_of_a_pi_corral():
+    assert find_pi_corral(Map.from_str(FENCED)) == FENCE
+
+
+def test_without_a_corral_nothing_is_found():
+    room = '''
+    / / / / / /
+    / _ _ _ _ /
+    / P B _ X /
+    / _ _ _ _ /
+    / / / / / /
+    '''
+    assert find_pi_corral(Map.from_str(room)) is None
+
+
+def test_only_fence_pushes_are_kept():
+    map_obj = Map.from_str(FENCED)
+    neighbours = map_obj.get_neighbours(allow_pulls=False)
+    pruner = CorralPruner()
+    kept = pruner.filter(map_obj, neighbours)
+
+    for neigh in kept:
+        moved = map_obj.positions_of_boxes.keys() - neigh.positions_of_boxes.keys()
+        assert moved <= FENCE
+    assert len(kept) + pruner.pruned == len(neighbours)
+    assert pruner.stats() == {'expansions': 1, 'corrals': 1, 'pruned': 2}
+
+
+@pytest.mark.parametrize('name', ['hard_map1', 'hard_map2'])
+def test_pruned_search_still_solves(name):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+    solver = BeamSearch(map_obj, 10, min_weight_bfs)
+    solver.enable_corral_pruning()
+    path = solver.solve()
+
+    assert replay(map_obj, moves_from_path(path))['solved']
+    assert solver.pruned_successors > 0
+    assert solver.pruned_successors == solver.corral_pruner.pruned
+
+
+@pytest.mark.parametrize('make_solver', [
+    lambda map_obj: BeamSearch(map_obj, 10, min_weight_bfs, allow_pulls=True),
+    lambda map_obj: LrtaStar(map_obj, min_weight_bfs, allow_pulls=True),
+])
+def test_pruning_is_refused_with_pull_moves(make_solver):
+    solver = make_solver(Map.from_str(FENCED))
+
+    with pytest.raises(ValueError):
+        solver.enable_corral_pruning()
+    assert solver.corral_pruner is None
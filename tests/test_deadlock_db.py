@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods.beam_search import BeamSearch
+from search_methods.deadlock_db import DeadlockDatabase
+from search_methods.heuristics import min_weight_bfs
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_map(name):
+    return Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+
+
+def test_saved_patterns_are_tied_to_their_level(tmp_path):
+    map_obj = load_map('easy_map1')
+    db = DeadlockDatabase()
+    db.precompute(map_obj)
+
+    path = DeadlockDatabase.path_for(map_obj, str(tmp_path))
+    assert map_obj.level.fingerprint in os.path.basename(path)
+    db.save(path, map_obj)
+
+    assert DeadlockDatabase.load(path, map_obj).patterns == db.patterns
+    with pytest.raises(ValueError):
+        DeadlockDatabase.load(path, load_map('easy_map2'))
+
+
+def test_patterns_of_another_level_are_rebuilt(tmp_path):
+    map_obj, other = load_map('easy_map1'), load_map('easy_map2')
+    db = DeadlockDatabase()
+    db.precompute(other)
+    # A file of the wrong level sitting where the patterns of map_obj are expected
+    path = DeadlockDatabase.path_for(map_obj, str(tmp_path))
+    db.save(path, other)
+
+    rebuilt = DeadlockDatabase.load_or_precompute(map_obj, str(tmp_path))
+
+    expected = DeadlockDatabase()
+    expected.precompute(map_obj)
+    assert rebuilt.patterns == expected.patterns
+    with open(path) as file:
+        assert json.load(file)['fingerprint'] == map_obj.level.fingerprint
+
+
+def test_matched_only_counts_the_search_lookups():
+    map_obj = load_map('medium_map1')
+    db = DeadlockDatabase()
+    db.precompute(map_obj)
+    assert db.matched == 0
+
+    solver = BeamSearch(map_obj, 10, min_weight_bfs)
+    solver.use_deadlock_db(db)
+    path = solver.solve()
+
+    assert path[-1].is_solved()
+    assert db.matched > 0
+
+
+def test_database_is_refused_with_pull_moves():
+    solver = BeamSearch(load_map('easy_map1'), 10, min_weight_bfs, allow_pulls=True)
+    with pytest.raises(ValueError):
+        solver.use_deadlock_db(DeadlockDatabase())
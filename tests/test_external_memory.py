@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods.beam_search import BeamSearch
+from search_methods.external_memory import ParentLog, SortedRuns, StatePacker
+from search_methods.heuristics import min_weight_bfs
+
+import numpy as np
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def keys_of(count, offset=0):
+    ''' count distinct two-box state keys '''
+    return [((i % 7, i // 7), ((i, 1), (i, 2))) for i in range(offset, offset + count)]
+
+
+def test_packed_rows_round_trip_and_sort_like_the_keys():
+    packer = StatePacker(2)
+    keys = [((3, 1), ((2, 2), (4, 1))), ((1, 300), ((2, 2), (4, 1))), ((1, 2), ((5, 1), (6, 6)))]
+    rows = packer.pack(keys)
+
+    assert [packer.unpack(row) for row in rows] == keys
+    assert [packer.unpack(rows[i]) for i in np.argsort(packer.as_keys(rows))] == sorted(keys)
+
+
+def test_runs_are_merged_without_duplicates(tmp_path):
+    packer = StatePacker(2)
+    # A tiny merge chunk so the merges go through several chunks
+    visited = SortedRuns(str(tmp_path), packer, merge_chunk=3)
+
+    visited.add(packer.pack(keys_of(10)))
+    visited.add(packer.pack(keys_of(10, offset=5) + keys_of(4)))
+    assert len(visited.runs) == 2
+    # Five new states make a run as big as the last one, which cascades into a single run
+    visited.add(packer.pack(keys_of(10) + keys_of(5, offset=15)))
+
+    assert len(visited) == 20
+    assert len(visited.runs) == 1
+    assert len(os.listdir(tmp_path)) == 1
+    assert visited.contains(packer.pack(keys_of(3, offset=18) + keys_of(3, offset=30))).tolist() == [
+        True, True, False, False, False, False]
+
+    merged = visited.run_keys(*visited.runs[0])
+    assert (merged[1:] > merged[:-1]).all()
+
+
+def test_parent_log_traces_back_to_the_root(tmp_path):
+    packer = StatePacker(2)
+    log = ParentLog(str(tmp_path), packer)
+    keys = keys_of(5)
+
+    assert log.append(packer.pack(keys[:1]), [-1]) == 0
+    assert log.append(packer.pack(keys[1:3]), [0, 0]) == 1
+    assert log.append(packer.pack(keys[3:]), [2, 1]) == 3
+
+    assert log.trace(3) == [keys[0], keys[2], keys[3]]
+    assert log.trace(4) == [keys[0], keys[1], keys[4]]
+    assert log.trace(0) == [keys[0]]
+
+
+@pytest.mark.parametrize('name', ['easy_map1', 'medium_map1'])
+def test_disk_search_finds_the_in_memory_path(tmp_path, name):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+
+    in_memory = BeamSearch(map_obj, 10, min_weight_bfs).solve()
+    on_disk = BeamSearch(map_obj, 10, min_weight_bfs, external_dir=str(tmp_path)).solve()
+
+    assert on_disk[-1].is_solved()
+    assert [state.state_key() for state in on_disk] == [state.state_key() for state in in_memory]
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods.frontier import BucketQueue
+
+import heapq
+import random
+import pytest
+
+
+def drain(queue):
+    return [queue.pop() for _ in range(len(queue))]
+
+
+def test_lowest_priority_first_and_ties_in_insertion_order():
+    queue = BucketQueue()
+    for priority, item in [(3, 'a'), (1, 'b'), (0xffffff, 'c'), (1, 'd'), (0, 'e'), (3, 'f')]:
+        queue.push(priority, item)
+
+    assert queue.peek_priority() == 0
+    assert drain(queue) == [(0, 'e'), (1, 'b'), (1, 'd'), (3, 'a'), (3, 'f'), (0xffffff, 'c')]
+    assert not queue and queue.buckets == {} and queue.priorities == []
+
+
+def test_lifo_ties():
+    queue = BucketQueue(lifo=True)
+    for priority, item in [(2, 'a'), (2, 'b'), (1, 'c'), (2, 'd')]:
+        queue.push(priority, item)
+
+    assert drain(queue) == [(1, 'c'), (2, 'd'), (2, 'b'), (2, 'a')]
+
+
+def test_same_order_as_a_stable_heap():
+    rng = random.Random(5)
+    queue, heap = BucketQueue(), []
+    for count in range(500):
+        priority = rng.randrange(20)
+        queue.push(priority, count)
+        heapq.heappush(heap, (priority, count))
+        # Interleave pops with the pushes, so buckets empty and come back
+        if count % 3 == 0:
+            assert queue.pop() == heapq.heappop(heap)
+
+    assert drain(queue) == [heapq.heappop(heap) for _ in range(len(heap))]
+
+
+def test_items_are_never_compared():
+    queue = BucketQueue()
+    map_obj = Map.from_str('/ / / / /\n/ X B P /\n/ / / / /')
+    queue.push(4, map_obj)
+    queue.push(4, map_obj.copy())
+
+    assert queue.pop()[1] is map_obj
+
+
+@pytest.mark.parametrize('priority', [-1, 2.5, '3'])
+def test_bad_priorities_are_refused(priority):
+    with pytest.raises(ValueError):
+        BucketQueue().push(priority, 'item')
+
+
+def test_empty_queue():
+    queue = BucketQueue()
+
+    with pytest.raises(IndexError):
+        queue.pop()
+    with pytest.raises(IndexError):
+        queue.peek_priority()
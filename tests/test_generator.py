@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.generator import generate_level, generate_levels
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import min_weight_bfs
+
+import pytest
+
+
+def test_same_seed_gives_the_same_level():
+    first = generate_level(8, 8, 3, seed=7)
+    second = generate_level(8, 8, 3, seed=7)
+
+    assert first.level.fingerprint == second.level.fingerprint
+    assert first.state_key() == second.state_key()
+    assert generate_level(8, 8, 3, seed=8).level.fingerprint != first.level.fingerprint
+
+
+def test_levels_derive_their_seeds():
+    levels = generate_levels([(6, 6, 2), (7, 7, 2)], seed=3)
+
+    assert [level.level.fingerprint for level in levels] == [
+        generate_level(6, 6, 2, seed=3).level.fingerprint,
+        generate_level(7, 7, 2, seed=4).level.fingerprint,
+    ]
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_generated_levels_are_solvable(seed):
+    map_obj = generate_level(7, 7, 2, seed=seed)
+    floor = map_obj.level.floor
+
+    assert len(map_obj.positions_of_boxes) == len(map_obj.level.target_set) == 2
+    assert (map_obj.player.x, map_obj.player.y) in floor
+    assert set(map_obj.positions_of_boxes) <= floor
+    assert not map_obj.is_solved()
+
+    path = BeamSearch(map_obj, 50, min_weight_bfs).solve()
+    assert path[-1].is_solved()
@@ -0,0 +1,100 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.replay import moves_from_path, replay
+from search_methods.h_table import SLOT_BYTES, BoundedHTable
+from search_methods.heuristics import min_weight_bfs
+from search_methods.lrta_star import LrtaStar
+
+import math
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 16 slots, so the table evicts when a 9th entry comes in
+SMALL = 16 * SLOT_BYTES
+
+
+def key(i):
+    ''' A distinct state key '''
+    return ((i, 0), ((i, 1), (i, 2)))
+
+
+def filled(policy, protected, values=None):
+    table = BoundedHTable(SMALL, policy, protected=protected)
+    for i in range(8):
+        table[key(i)] = 1.0 if values is None else values[i]
+    return table
+
+
+def test_behaves_like_a_dict():
+    table = BoundedHTable(SMALL)
+    table[key(1)] = 2.5
+    table[key(1)] = 4.0
+
+    assert key(1) in table and key(2) not in table
+    assert table[key(1)] == 4.0 and len(table) == 1
+    assert table.get(key(2), 7) == 7
+    with pytest.raises(KeyError):
+        table[key(2)]
+
+
+@pytest.mark.parametrize('max_bytes, policy', [(SMALL - 1, 'lru'), (SMALL, 'fifo')])
+def test_bad_settings_are_refused(max_bytes, policy):
+    with pytest.raises(ValueError):
+        BoundedHTable(max_bytes, policy)
+
+
+def test_lru_eviction_drops_the_oldest_and_keeps_the_values():
+    values = [0.5, 1.5, 2.5, 3.5, math.inf, 5.5, 6.5, 7.5]
+    table = filled('lru', 2, values)
+    # Reading an entry makes it recent again
+    table[key(0)]
+    table[key(8)] = 8.5
+
+    assert table.stats()['evictions'] == 1 and table.stats()['evicted'] == 2
+    assert key(1) not in table and key(2) not in table
+    assert len(table) == 7
+    for i in [0, 3, 4, 5, 6, 7]:
+        assert table[key(i)] == values[i]
+    assert table[key(8)] == 8.5
+
+
+def test_increase_eviction_drops_what_learning_raised_the_least():
+    table = filled('increase', 2)
+    for i in range(6):
+        table[key(i)] = 1.0 + (i + 1)
+    # Never raised, but used by the last two accesses
+    table[key(6)]
+    table[key(7)]
+    table[key(8)] = 1.0
+
+    assert key(0) not in table and key(1) not in table
+    assert all(key(i) in table for i in range(2, 9))
+    assert table[key(5)] == 7.0
+
+
+def test_deadlocks_do_not_poison_the_increases():
+    table = filled('increase', 0)
+    table[key(0)] = math.inf
+    table[key(0)] = math.inf
+    table[key(1)] = 5.0
+    table[key(8)] = 1.0
+
+    assert not any(math.isnan(increase) for increase in table.increases)
+    # The only entry learning raised is the last one to go
+    assert table[key(1)] == 5.0
+
+
+@pytest.mark.parametrize('policy', ['lru', 'increase'])
+def test_lrta_star_solves_with_a_bounded_table(policy):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, 'medium_map1.yaml'))
+    solver = LrtaStar(map_obj, min_weight_bfs, max_steps=20000, h_table_bytes=4000, h_table_policy=policy)
+    path = solver.solve()
+
+    assert replay(map_obj, moves_from_path(path))['solved']
+    assert solver.H_table.nbytes <= 4000
+    assert len(solver.H_table) <= solver.H_table.max_entries
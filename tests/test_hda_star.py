@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.replay import moves_from_path, replay
+from search_methods.hda_star import HdaStar, owner_of
+from search_methods.heuristics import min_weight_bfs, min_weight_manhattan
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.mark.parametrize('name', ['easy_map1', 'medium_map1'])
+def test_workers_find_a_valid_path(name):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+    solver = HdaStar(map_obj, min_weight_bfs, num_workers=2)
+    path = solver.solve()
+
+    assert path[-1].is_solved()
+    assert replay(map_obj, moves_from_path(path))['solved']
+    assert solver.explored_states > 0
+    assert multiprocessing.active_children() == []
+
+
+def test_exhausted_search_stops_every_worker():
+    # The only target sits in a pocket the box can't be pushed into
+    walls = [(3, 0), (3, 1), (3, 2), (3, 3), (3, 4), (4, 4), (0, 5), (1, 5), (2, 5)]
+    map_obj = Map(5, 6, 1, 1, [('box', 2, 2)], [(4, 5)], walls)
+
+    assert HdaStar(map_obj, min_weight_manhattan, num_workers=2).solve() is None
+    assert multiprocessing.active_children() == []
+
+
+def test_states_have_a_single_owner():
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, 'hard_map1.yaml'))
+    keys = [map_obj.state_key()] + [state.state_key() for state in map_obj.get_neighbours(allow_pulls=False)]
+
+    for key in keys:
+        assert owner_of(key, 3) == owner_of(key, 3)
+        assert 0 <= owner_of(key, 3) < 3
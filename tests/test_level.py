@@ -0,0 +1,55 @@
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.level import Level
+from sokoban.map import Map
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_map(name):
+    return Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+
+
+@pytest.mark.parametrize('name', ['easy_map1', 'medium_map1', 'super_hard_map1'])
+def test_fingerprint_survives_a_round_trip(name):
+    map_obj = load_map(name)
+
+    assert Map.from_dict(map_obj.to_dict()).level.fingerprint == map_obj.level.fingerprint
+    assert load_map(name).level.fingerprint == map_obj.level.fingerprint
+    assert pickle.loads(pickle.dumps(map_obj)).level.fingerprint == map_obj.level.fingerprint
+
+
+def test_fingerprint_only_depends_on_the_static_board():
+    level = Level(4, 5, [(0, 0), (3, 4)], [(1, 1), (2, 2)])
+
+    # The name and the order of the walls don't matter
+    assert Level(4, 5, [(3, 4), (0, 0)], [(1, 1), (2, 2)], test_name='other').fingerprint == level.fingerprint
+    assert Level(4, 5, [(0, 0)], [(1, 1), (2, 2)]).fingerprint != level.fingerprint
+    assert Level(5, 4, [(0, 0), (3, 4)], [(1, 1), (2, 2)]).fingerprint != level.fingerprint
+    # The per-target tables are indexed in target order
+    assert Level(4, 5, [(0, 0), (3, 4)], [(2, 2), (1, 1)]).fingerprint != level.fingerprint
+
+    map_obj = Map.from_level(level, 1, 2, [('box', 2, 1)])
+    assert Map.from_level(level, 2, 3, [('box', 1, 3)]).level.fingerprint == map_obj.level.fingerprint
+
+
+def test_levels_are_immutable():
+    level = load_map('easy_map1').level
+
+    with pytest.raises(AttributeError):
+        level.targets = ()
+    with pytest.raises(AttributeError):
+        level.fingerprint = 'forged'
+
+
+def test_states_share_their_level():
+    map_obj = load_map('medium_map1')
+
+    assert map_obj.copy().level is map_obj.level
+    assert all(neigh.level is map_obj.level for neigh in map_obj.get_neighbours(allow_pulls=True))
@@ -0,0 +1,88 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods import level_cache
+from search_methods.level_cache import LevelCache
+from search_methods.push_distances import compute_push_distances
+
+import numpy as np
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_map(name):
+    return Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+
+
+class Counter:
+    ''' compute callback that remembers how many times it ran '''
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, map_obj):
+        self.calls += 1
+        return compute_push_distances(map_obj)
+
+
+def test_artifacts_are_computed_once_per_level():
+    cache = LevelCache()
+    compute = Counter()
+    map_obj = load_map('easy_map1')
+
+    first = cache.get(map_obj, 'push_distances', compute)
+    # Another state of the same level shares its artifacts
+    neighbour = map_obj.get_neighbours(allow_pulls=False)[0]
+    assert cache.get(neighbour, 'push_distances', compute) is first
+    cache.get(load_map('easy_map2'), 'push_distances', compute)
+
+    assert compute.calls == 2
+    assert cache.stats() == {'artifacts': 2, 'hits': 1, 'loads': 0, 'misses': 2, 'evictions': 0}
+
+
+def test_a_new_process_loads_the_artifacts_from_disk(tmp_path):
+    map_obj = load_map('medium_map1')
+    compute = Counter()
+
+    written = LevelCache(str(tmp_path)).get(map_obj, 'push_distances', compute)
+    reader = LevelCache(str(tmp_path))
+    loaded = reader.get(map_obj, 'push_distances', compute)
+
+    assert compute.calls == 1
+    assert reader.stats()['loads'] == 1 and reader.stats()['misses'] == 0
+    assert np.array_equal(loaded, written)
+
+
+def test_a_format_change_ignores_the_old_files(tmp_path, monkeypatch):
+    map_obj = load_map('medium_map1')
+    compute = Counter()
+    LevelCache(str(tmp_path)).get(map_obj, 'push_distances', compute)
+
+    monkeypatch.setattr(level_cache, 'CACHE_FORMAT_VERSION', level_cache.CACHE_FORMAT_VERSION + 1)
+    reader = LevelCache(str(tmp_path))
+    reader.get(map_obj, 'push_distances', compute)
+
+    assert compute.calls == 2
+    assert reader.stats()['loads'] == 0 and reader.stats()['misses'] == 1
+    assert sorted(os.listdir(tmp_path)) == [f'v{level_cache.CACHE_FORMAT_VERSION - 1}',
+                                            f'v{level_cache.CACHE_FORMAT_VERSION}']
+
+
+def test_least_recently_used_artifacts_are_dropped():
+    cache = LevelCache(max_artifacts=2)
+    compute = Counter()
+    maps = [load_map(name) for name in ['easy_map1', 'easy_map2', 'medium_map1']]
+
+    cache.get(maps[0], 'push_distances', compute)
+    cache.get(maps[1], 'push_distances', compute)
+    cache.get(maps[0], 'push_distances', compute)
+    # easy_map2 was used least recently, so it makes room for medium_map1
+    cache.get(maps[2], 'push_distances', compute)
+    cache.get(maps[0], 'push_distances', compute)
+    cache.get(maps[1], 'push_distances', compute)
+
+    assert compute.calls == 4
+    assert cache.stats() == {'artifacts': 2, 'hits': 2, 'loads': 0, 'misses': 4, 'evictions': 2}
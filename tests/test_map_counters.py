@@ -0,0 +1,92 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.moves import RIGHT
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import nearest_push, nearest_push_rows, track_nearest_push
+from search_methods.lrta_star import LrtaStar
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def recount(map_obj):
+    ''' The counters of a state, computed from scratch '''
+    rows = nearest_push_rows(map_obj)
+    on_targets = sum(position in map_obj.level.target_set for position in map_obj.positions_of_boxes)
+    return on_targets, sum(rows[x][y] for x, y in map_obj.positions_of_boxes)
+
+
+@pytest.mark.parametrize('name', ['easy_map1', 'medium_map1', 'hard_map1', 'large_map1'])
+def test_counters_match_a_recount_after_pushes_pulls_and_copies(name):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+    track_nearest_push(map_obj)
+    rng = random.Random(0)
+
+    state = map_obj
+    pulls = pushes = 0
+    for _ in range(300):
+        neighbours = state.get_neighbours(allow_pulls=True)
+        if not neighbours:
+            break
+        neigh = rng.choice(neighbours)
+        pulls += neigh.undo_moves > state.undo_moves
+        pushes += neigh.moved_box is not None and neigh.undo_moves == state.undo_moves
+        # Every other step goes on from a copy, whose counters have to stay independent
+        state = neigh.copy() if rng.random() < 0.5 else neigh
+
+        assert (state.boxes_on_targets, state.distance_sum) == recount(state)
+        assert state.is_solved() == (recount(state)[0] == len(state.level.target_set))
+
+    assert pulls > 0 and pushes > 0
+    # The walk never changed the map it started from
+    assert (map_obj.boxes_on_targets, map_obj.distance_sum) == recount(map_obj)
+
+
+def test_moved_box_names_the_pushed_box():
+    map_obj = Map.from_str('P _ B X')
+    walk = map_obj.copy()
+    walk.apply_move(RIGHT)
+    push = walk.copy()
+    push.apply_move(RIGHT)
+
+    assert map_obj.moved_box is None and walk.moved_box is None
+    assert push.moved_box == 'box0_2'
+    assert push.copy().moved_box == 'box0_2'
+    assert push.boxes_on_targets == 1 and push.is_solved()
+
+
+class CountingNearestPush:
+    ''' nearest_push that records whether the states it scores carry the running sum '''
+
+    def __init__(self):
+        self.calls = 0
+        self.tracked = 0
+
+    def __call__(self, map_obj, cache=None):
+        self.calls += 1
+        self.tracked += map_obj.distance_table is not None
+        return nearest_push(map_obj, cache)
+
+    track_state = staticmethod(track_nearest_push)
+
+
+@pytest.mark.parametrize('make_solver', [
+    lambda map_obj, heuristic: BeamSearch(map_obj, 10, heuristic),
+    lambda map_obj, heuristic: LrtaStar(map_obj, heuristic, max_steps=2000),
+])
+def test_solvers_score_tracked_states(make_solver):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, 'medium_map1.yaml'))
+    heuristic = CountingNearestPush()
+
+    path = make_solver(map_obj, heuristic).solve()
+
+    assert path[-1].is_solved()
+    assert heuristic.calls > 0 and heuristic.tracked == heuristic.calls
+    # Tracking started on a copy of the map given to the solver
+    assert map_obj.distance_table is None
@@ -0,0 +1,61 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import min_weight_bfs
+from search_methods.packing import blocked_targets, packing_order
+
+# A dead-end corridor of three targets opening into a room: boxes have to go in deepest first.
+# Rows are reversed by from_str, so the corridor is row 5 and its deepest target is (5, 1)
+CORRIDOR_ROOM = '''
+/ / / / / / / / /
+/ X X X _ _ _ _ /
+/ / / / _ _ _ _ /
+/ / / / _ B _ _ /
+/ / / / _ B B _ /
+/ / / / _ _ P _ /
+/ / / / / / / / /
+'''
+DEEPEST, MIDDLE, ENTRANCE = (5, 1), (5, 2), (5, 3)
+
+
+def with_boxes(text, boxes):
+    ''' The level of text with its boxes moved to the given squares '''
+    map_obj = Map.from_str(text)
+    return Map.from_level(map_obj.level, map_obj.player.x, map_obj.player.y,
+                          [(f'box{i}', x, y) for i, (x, y) in enumerate(boxes)])
+
+
+def test_corridor_is_packed_deepest_first():
+    assert packing_order(Map.from_str(CORRIDOR_ROOM)) == [[DEEPEST, MIDDLE, ENTRANCE]]
+
+
+def test_pulled_boxes_stay_in_the_way():
+    # Without a room to move them aside, a box pulled out of the corridor blocks the next one
+    corridor = '''
+    / / / / / / /
+    / X X _ _ P /
+    / / / / / / /
+    '''
+    assert packing_order(Map.from_str(corridor)) == [None]
+
+
+def test_blocked_targets_follow_the_order():
+    assert blocked_targets(with_boxes(CORRIDOR_ROOM, [DEEPEST, (3, 5), (3, 6)])) == 0
+    # A box on its way in doesn't cut anything off yet
+    assert blocked_targets(with_boxes(CORRIDOR_ROOM, [ENTRANCE, (3, 5), (3, 6)])) == 0
+    # Two boxes stuck in front of the deepest target
+    assert blocked_targets(with_boxes(CORRIDOR_ROOM, [MIDDLE, ENTRANCE, (3, 5)])) == 1
+
+
+def test_packing_pruning_keeps_the_level_solvable():
+    map_obj = Map.from_str(CORRIDOR_ROOM)
+    solver = BeamSearch(map_obj, 50, min_weight_bfs)
+    solver.enable_packing_pruning()
+    path = solver.solve()
+
+    assert path[-1].is_solved()
+    assert solver.pruned_successors > 0
@@ -0,0 +1,99 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.replay import moves_from_path, replay
+from search_methods.beam_search import BeamSearch
+from search_methods.hda_star import HdaStar
+from search_methods.lrta_star import LrtaStar
+
+import pytest
+
+# The box starts in a corner, so it has to be pulled out once before it can be pushed home
+CORNERED = '''
+/ / / / / / / /
+/ _ _ _ _ _ _ /
+/ X _ _ _ P B /
+/ / / / / / / /
+'''
+
+
+def box_distance(map_obj):
+    ''' Manhattan distance of every box to its nearest target, which doesn't give up on boxes in corners '''
+    return sum(min(abs(x - tx) + abs(y - ty) for tx, ty in map_obj.targets)
+               for x, y in map_obj.positions_of_boxes)
+
+
+def beam_search(map_obj):
+    return BeamSearch(map_obj, 20, box_distance, allow_pulls=True)
+
+def lrta_star(map_obj):
+    return LrtaStar(map_obj, box_distance, allow_pulls=True, max_steps=5000)
+
+
+def test_the_budget_is_spent_by_pulls_only():
+    map_obj = Map.from_str(CORNERED)
+    map_obj.pull_budget = 1
+
+    neighbours = map_obj.get_neighbours(allow_pulls=True)
+    pulled = next(neigh for neigh in neighbours if (1, 5) in neigh.positions_of_boxes)
+    assert pulled.pull_budget == 0
+    assert all(neigh.pull_budget == 1 for neigh in neighbours if neigh is not pulled)
+    # With nothing left, the box can't be pulled any further
+    assert all((1, 4) not in neigh.positions_of_boxes for neigh in pulled.get_neighbours(allow_pulls=True))
+
+
+def test_budgets_are_told_apart_in_the_hashable_state():
+    map_obj = Map.from_str(CORNERED)
+    solver = beam_search(map_obj)
+    unlimited = solver.get_hashable_state(map_obj)
+    solver.set_pull_budget(2)
+    two_left = solver.get_hashable_state(solver.map)
+    solver.map.pull_budget = 1
+
+    assert two_left[:2] == unlimited
+    assert len({unlimited, two_left, solver.get_hashable_state(solver.map)}) == 3
+    assert solver.map_from_hashable_state(two_left).pull_budget == 2
+
+
+@pytest.mark.parametrize('make_solver', [beam_search, lrta_star])
+@pytest.mark.parametrize('budget', [1, 2])
+def test_paths_stay_within_the_budget(make_solver, budget):
+    map_obj = Map.from_str(CORNERED)
+    solver = make_solver(map_obj)
+    solver.set_pull_budget(budget)
+    path = solver.solve()
+
+    result = replay(map_obj, moves_from_path(path))
+    assert result['solved']
+    assert 1 <= result['pulls'] <= budget
+    assert path[0].pull_budget == budget
+    # The caller's map is left as it was
+    assert map_obj.pull_budget is None
+
+
+@pytest.mark.parametrize('make_solver', [beam_search, lrta_star])
+def test_without_pulls_left_the_box_stays_cornered(make_solver):
+    solver = make_solver(Map.from_str(CORNERED))
+    solver.set_pull_budget(0)
+    path = solver.solve()
+
+    assert not path or not path[-1].is_solved()
+
+
+@pytest.mark.parametrize('make_solver, budget', [
+    (lambda map_obj: BeamSearch(map_obj, 20, box_distance), 1),
+    (lambda map_obj: LrtaStar(map_obj, box_distance), 1),
+    (beam_search, -1),
+    (lambda map_obj: BeamSearch(map_obj, 20, box_distance, allow_pulls=True, external_dir='.'), 1),
+    (lambda map_obj: HdaStar(map_obj, box_distance, num_workers=1, allow_pulls=True), 1),
+])
+def test_bad_budgets_are_refused(make_solver, budget):
+    map_obj = Map.from_str(CORNERED)
+    solver = make_solver(map_obj)
+
+    with pytest.raises(ValueError):
+        solver.set_pull_budget(budget)
+    assert solver.map.pull_budget is None
@@ -0,0 +1,89 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods.heuristics import min_weight_manhattan, min_weight_push
+from search_methods.level_cache import LevelCache
+from search_methods.push_distances import (
+    UNREACHABLE, compute_push_distances, dead_square_table, side_components,
+)
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Sides follow push_distances.DIRS: row below, row above, column left, column right
+BELOW, ABOVE, LEFT, RIGHT = range(4)
+
+CORRIDOR = '''
+/ / / / / / / /
+/ X _ _ B _ P /
+/ / / / / / / /
+'''
+
+ROOM = '''
+/ / / / / / /
+/ _ _ _ _ _ /
+/ _ _ X _ _ /
+/ _ _ B _ P /
+/ _ _ _ _ _ /
+/ / / / / / /
+'''
+
+
+def test_a_box_in_a_corridor_cuts_it_in_two():
+    floor = Map.from_str(CORRIDOR).level.floor
+
+    assert side_components(floor, (1, 4)) == [None, None, 0, 1]
+
+
+def test_the_player_walks_around_a_box_in_a_room():
+    floor = Map.from_str(ROOM).level.floor
+
+    assert side_components(floor, (2, 3)) == [0, 0, 0, 0]
+    # Against the wall the player can't reach the side below
+    assert side_components(floor, (1, 3)) == [None, 0, 0, 0]
+
+
+def test_pushes_need_the_player_behind_the_box():
+    map_obj = Map.from_str(CORRIDOR)
+    table = compute_push_distances(map_obj)
+
+    assert table[0, 1, 4, RIGHT] == 3
+    # From the target's side the player can never get behind the box
+    assert table[0, 1, 4, LEFT] == UNREACHABLE
+    assert table[0, 1, 1].tolist() == [0, 0, 0, 0]
+    # Nothing pushes a box back out of the dead end next to the player
+    assert (table[0, 1, 6] == UNREACHABLE).all()
+
+
+def test_corners_are_dead_squares():
+    map_obj = Map.from_str(ROOM)
+    dead = dead_square_table(map_obj, LevelCache())
+
+    assert dead[1, 1] and dead[4, 5]
+    # A box against the bottom wall can only slide along it, away from the target's row
+    assert dead[1, 3]
+    assert not dead[2, 3] and not dead[3, 3]
+    # Walls are not floor, let alone dead floor
+    assert not dead[0, 0]
+
+
+def test_push_matching_is_an_admissible_bound():
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, 'medium_map1.yaml'))
+
+    assert min_weight_push(Map.from_str(CORRIDOR)) == 3
+    assert min_weight_push(Map.from_str(ROOM)) == 1
+    assert min_weight_push(map_obj) >= min_weight_manhattan(map_obj)
+
+
+def test_a_box_that_cant_be_pushed_back_is_stuck():
+    # Nothing can get between the box and the wall to push it back to the left
+    level = '''
+    / / / / / / /
+    / X _ _ P B /
+    / / / / / / /
+    '''
+    assert min_weight_push(Map.from_str(level)) == float('inf')
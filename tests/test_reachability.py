@@ -0,0 +1,89 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import min_weight_bfs_with_player
+from search_methods.reachability import ReachabilityCache, flood_player_region
+
+import pytest
+import random
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class CountingHeuristic:
+    ''' Wraps a heuristic to count its calls, keeping its signature for use_reachability '''
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, map_obj, cache=None, reachability=None):
+        self.calls += 1
+        return min_weight_bfs_with_player(map_obj, cache, reachability)
+
+
+@pytest.mark.parametrize('name', ['medium_map1', 'hard_map1', 'super_hard_map1'])
+def test_cached_regions_give_the_same_values(name):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+    reachability = ReachabilityCache()
+
+    states = [map_obj]
+    for state in map_obj.get_neighbours(allow_pulls=False):
+        states.append(state)
+        states.extend(state.get_neighbours(allow_pulls=False))
+
+    for state in states:
+        assert min_weight_bfs_with_player(state, reachability=reachability) == min_weight_bfs_with_player(state)
+
+
+def test_solver_floods_once_per_region():
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, 'hard_map1.yaml'))
+
+    plain = BeamSearch(map_obj, 10, min_weight_bfs_with_player)
+    plain_path = plain.solve()
+
+    heuristic = CountingHeuristic()
+    reachability = ReachabilityCache()
+    cached = BeamSearch(map_obj, 10, heuristic)
+    cached.use_reachability(reachability)
+    cached_path = cached.solve()
+
+    assert [state.state_key() for state in cached_path] == [state.state_key() for state in plain_path]
+    # Without the cache every call floods from the player, with it walking moves reuse the region
+    assert reachability.floods < heuristic.calls / 2
+
+
+def test_heuristic_without_reachability_is_rejected():
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, 'easy_map1.yaml'))
+    with pytest.raises(ValueError):
+        BeamSearch(map_obj, 10, lambda state: 0).use_reachability(ReachabilityCache())
+
+
+@pytest.mark.parametrize('name', ['medium_map1', 'hard_map1', 'large_map1'])
+def test_regions_after_moves_match_a_fresh_flood(name):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, f'{name}.yaml'))
+    reachability = ReachabilityCache()
+    rng = random.Random(0)
+
+    state = map_obj
+    for _ in range(300):
+        region = reachability.get(state)
+        player = (state.player.x, state.player.y)
+        assert region.cells == flood_player_region(state, player, state.positions_of_boxes)
+        state = rng.choice(state.get_neighbours(allow_pulls=True))
+
+    # Pushes from a cached region are derived from it instead of flooding the map again
+    assert reachability.incremental > 0
+
+
+def test_levels_sharing_a_cache_keep_their_own_regions():
+    reachability = ReachabilityCache()
+    open_level = Map.from_str('P _ _ B X')
+    walled_level = Map.from_str('P / _ B X')
+
+    assert len(reachability.get(open_level)) == 3
+    # Same boxes and player, but the wall cuts the region down to the player's square
+    assert len(reachability.get(walled_level)) == 1
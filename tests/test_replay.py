@@ -0,0 +1,100 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from sokoban.moves import BOX_LEFT, BOX_RIGHT, LEFT
+from sokoban.replay import map_moves, moves_from_path, replay, replay_batch
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import min_weight_bfs
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rows are reversed by from_str, the corridor is row 1 and its target is (1, 1)
+CORRIDOR = '''
+/ / / / / / / /
+/ X _ _ B _ P /
+/ / / / / / / /
+'''
+
+
+def yaml_path(name):
+    return os.path.join(TESTS_DIR, f'{name}.yaml')
+
+
+def test_pushes_are_uppercase():
+    result = replay(Map.from_str(CORRIDOR), 'lLLL')
+
+    assert result['valid'] and result['solved']
+    assert (result['steps'], result['pushes'], result['pulls']) == (4, 3, 0)
+    assert result['player'] == (1, 2) and result['boxes'] == [(1, 1)]
+
+
+@pytest.mark.parametrize('moves, offset', [
+    ('ll', 1),     # walking into a box
+    ('lLLLL', 4),  # pushing a box into the wall
+    ('r', 0),      # walking into the wall
+    ('L', 0),      # pushing nothing
+    ('lx', 1),     # not a move
+    ('l-', 2),     # a pull prefix with nothing after it
+    ('-l', 1),     # a pull is uppercase
+])
+def test_illegal_moves_are_located(moves, offset):
+    result = replay(Map.from_str(CORRIDOR), moves)
+
+    assert not result['valid'] and result['error']
+    assert result['error_offset'] == offset
+
+
+def test_pulls_drag_the_box_behind_the_player():
+    map_obj = Map.from_str(CORRIDOR)
+    # After a step left, stepping back right can drag the box along
+    map_obj.apply_move(LEFT)
+    pulled = next(neigh for neigh in map_obj.get_neighbours(allow_pulls=True)
+                  if (1, 5) in neigh.positions_of_boxes)
+
+    moves = moves_from_path([map_obj, pulled])
+    assert moves == '-R'
+    assert map_moves(moves) == [BOX_RIGHT]
+    result = replay(map_obj, moves)
+    assert result['valid'] and result['pulls'] == 1
+    assert result['player'] == (1, 6) and result['boxes'] == [(1, 5)]
+
+
+def test_solver_paths_replay_from_every_level_format():
+    map_obj = Map.from_yaml(yaml_path('medium_map1'))
+    path = BeamSearch(map_obj, 10, min_weight_bfs).solve()
+    moves = moves_from_path(path)
+
+    assert len(moves) == len(path) - 1
+    for level in (map_obj, yaml_path('medium_map1'), map_obj.to_dict()):
+        assert replay(level, moves)['solved']
+
+    # The same moves drive a Map, with pushes as box moves
+    for move in map_moves(moves):
+        map_obj.apply_move(move)
+    assert map_obj.is_solved()
+    assert BOX_LEFT <= max(map_moves(moves))
+
+
+def test_states_that_are_not_consecutive_are_refused():
+    map_obj = Map.from_str(CORRIDOR)
+    far = map_obj.copy()
+    far.apply_move(LEFT)
+    far.apply_move(BOX_LEFT)
+
+    with pytest.raises(ValueError):
+        moves_from_path([map_obj, far])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batches_keep_the_order_of_their_jobs(workers):
+    jobs = [(yaml_path('easy_map1'), 'x'), (Map.from_str(CORRIDOR).to_dict(), 'lLLL')] * 3
+
+    results = replay_batch(jobs, workers=workers, chunksize=1)
+
+    assert results == [replay(level, moves) for level, moves in jobs]
+    assert [result['solved'] for result in results] == [False, True] * 3
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import sokoban
+from benchmarks.startup import HEAVY_MODULES, SOLVER_IMPORTS, measure
+
+import pytest
+
+
+def loaded_modules(code):
+    ''' The HEAVY_MODULES a fresh interpreter has loaded after running code '''
+    probe = f'{code}\nimport sys\nprint("heavy:" + ",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', probe], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    heavy = output.splitlines()[-1].removeprefix('heavy:')
+    return heavy.split(',') if heavy else []
+
+
+def test_solver_imports_stay_light():
+    assert measure(SOLVER_IMPORTS, 1)[2] == []
+
+
+def test_solving_from_text_never_loads_the_rendering_stack():
+    heavy = loaded_modules(
+        'from sokoban import Map\n'
+        'from search_methods.beam_search import BeamSearch\n'
+        'from search_methods.heuristics import min_weight_manhattan\n'
+        'level = "/ / / / / /\\n/ X _ B P /\\n/ / / / / /"\n'
+        'assert BeamSearch(Map.from_str(level), 5, min_weight_manhattan).solve()[-1].is_solved()'
+    )
+
+    assert not {'matplotlib', 'imageio', 'yaml'} & set(heavy)
+
+
+def test_lazy_helpers_are_imported_on_first_use():
+    from sokoban import gif, render
+
+    assert sokoban.create_gif is gif.create_gif
+    assert sokoban.create_figure is render.create_figure
+    with pytest.raises(AttributeError):
+        sokoban.not_a_helper
@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sokoban.map import Map
+from search_methods.beam_search import BeamSearch
+from search_methods.heuristics import min_weight_bfs
+from search_methods.trace import TraceRecorder, TraceTree, read_trace, state_id
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def traced_solve(path, sample_rate=1.0):
+    map_obj = Map.from_yaml(os.path.join(TESTS_DIR, 'medium_map1.yaml'))
+    solver = BeamSearch(map_obj, 10, min_weight_bfs)
+    solver.record_trace(TraceRecorder(path, sample_rate=sample_rate))
+    states = solver.solve()
+    solver.trace.close()
+    return solver, states
+
+
+def test_re_recorded_states_keep_every_reason():
+    tree = TraceTree([
+        (1, 0, 5.0, 0, 'none'),
+        (2, 1, 4.0, 1, 'none'),
+        (2, 1, 4.0, 1, 'visited'),
+        (3, 2, 0.0, 2, 'goal'),
+        # A duplicate generated by 3 before the state's own record, which holds its parent
+        (4, 3, 6.0, 3, 'visited'),
+        (4, 2, 6.0, 2, 'not_selected'),
+    ])
+
+    assert tree.nodes[2] == (1, 4.0, 1, ['none', 'visited'])
+    assert tree.nodes[4] == (2, 6.0, 2, ['visited', 'not_selected'])
+    assert tree.roots() == [1]
+    assert tree.path_to(3) == [1, 2, 3]
+    assert tree.children[3] == [] and tree.path_to(4) == [1, 2, 4]
+    assert tree.subtree_size(1) == 4
+
+
+@pytest.mark.parametrize('name', ['run.trace', 'run.jsonl'])
+def test_goal_path_is_rebuilt_from_the_trace(tmp_path, name):
+    solver, states = traced_solve(str(tmp_path / name))
+    records = list(read_trace(str(tmp_path / name)))
+    tree = TraceTree(records)
+
+    goal = state_id(solver.get_hashable_state(states[-1]))
+    assert 'goal' in tree.nodes[goal][3]
+    assert tree.path_to(goal) == [state_id(solver.get_hashable_state(state)) for state in states]
+
+
+def test_binary_and_json_traces_hold_the_same_records(tmp_path):
+    traced_solve(str(tmp_path / 'run.trace'))
+    traced_solve(str(tmp_path / 'run.jsonl'))
+
+    assert list(read_trace(str(tmp_path / 'run.trace'))) == list(read_trace(str(tmp_path / 'run.jsonl')))
+
+
+def test_sampling_keeps_or_drops_a_state_every_time(tmp_path):
+    traced_solve(str(tmp_path / 'full.trace'))
+    traced_solve(str(tmp_path / 'half.trace'), sample_rate=0.5)
+
+    full = list(read_trace(str(tmp_path / 'full.trace')))
+    half = list(read_trace(str(tmp_path / 'half.trace')))
+    kept = {record[0] for record in half}
+
+    assert 0 < len(half) < len(full)
+    assert half == [record for record in full if record[0] in kept]